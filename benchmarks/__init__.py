@@ -0,0 +1,4 @@
+"""Benchmarks for the EFS inventory validation hot paths.
+
+Run from the repository root, e.g. ``python -m benchmarks.group_resolver``.
+"""
@@ -0,0 +1,68 @@
+"""Compare the fused validation engine with the separate per-check passes."""
+
+import argparse
+import os
+import tempfile
+import time
+
+from benchmarks.pipeline import fleet_paths
+from efs_validation.checks import (check_control_group_balance, check_servertype_placement, check_unassigned_servers,
+                                   compare_inventory_with_efs)
+from efs_validation.efs import iter_efs_fixture_records, load_efs_servers
+from efs_validation.engine import validate_fused
+from efs_validation.findings import Findings
+from efs_validation.inventory import build_inventory_index, load_inventory
+
+
+def separate_checks(efs_servers, index):
+    """The checks one after another, each walking every EFS server."""
+    controlgroup_a, controlgroup_b = index.members('controlgroup_a'), index.members('controlgroup_b')
+    missing_servers, extra_servers, cell_mismatches = compare_inventory_with_efs(
+        efs_servers, index.host_cells, index.host_group)
+    return Findings(
+        missing_servers=missing_servers,
+        extra_servers=extra_servers,
+        cell_mismatches=cell_mismatches,
+        servertype_mismatches=check_servertype_placement(
+            efs_servers, index.members('servertype_dev'), index.members('servertype_prod')),
+        controlgroup_mismatches=(check_control_group_balance(efs_servers, controlgroup_a, controlgroup_b)
+                                 + check_unassigned_servers(efs_servers, controlgroup_a, controlgroup_b)),
+    )
+
+
+def _time(func, efs_servers, index, repeat):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func(efs_servers, index)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--hosts", type=int, default=100_000, help="fleet size (default: 100000)")
+    parser.add_argument("--seed", type=int, default=0, help="fleet random seed (default: 0)")
+    parser.add_argument("--repeat", type=int, default=5, help="best-of repetitions (default: 5)")
+    args = parser.parse_args(argv)
+
+    paths = fleet_paths(args.hosts, args.seed, os.path.join(tempfile.gettempdir(), 'efs_validation_fleets'))
+    efs_servers = load_efs_servers(iter_efs_fixture_records(paths['efs_fixture']))
+    index = build_inventory_index(load_inventory(paths['inventory_file']))
+
+    separate_time, separate_result = _time(separate_checks, efs_servers, index, args.repeat)
+    fused_time, fused_result = _time(validate_fused, efs_servers, index, args.repeat)
+
+    if separate_result != fused_result:
+        raise SystemExit("The fused engine disagrees with the separate checks")
+
+    print(f"hosts:            {args.hosts}")
+    print(f"findings:         {len(fused_result)}")
+    print(f"separate checks:  {separate_time:.3f} s")
+    print(f"fused engine:     {fused_time:.3f} s")
+    print(f"speedup:          {separate_time / fused_time:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,24 @@
+"""Stand-in for the `efs` binary that replays a recorded `efs display efsservers`.
+
+    EFS_FIXTURE=efs_display.txt python prod_new.py \
+        --efs-command "python benchmarks/fake_efs.py display efsservers"
+"""
+
+import os
+import shutil
+import sys
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    if argv[:2] != ['display', 'efsservers']:
+        sys.exit(f"fake_efs: unsupported command: {' '.join(argv)}")
+    fixture = os.environ.get('EFS_FIXTURE')
+    if not fixture:
+        sys.exit("fake_efs: set EFS_FIXTURE to a recorded `efs display efsservers` output")
+    with open(fixture, 'r') as file:
+        shutil.copyfileobj(file, sys.stdout)
+
+
+if __name__ == "__main__":
+    main()
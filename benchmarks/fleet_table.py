@@ -0,0 +1,101 @@
+"""Compare the numpy FleetTable diff with the dict based one, in time and memory.
+
+Both sides start from the same EFS dump and inventory index: the dict version
+folds the records into EfsServer objects and runs compare_inventory_with_efs,
+the table version interns them into arrays and runs FleetTable.compare.
+Building and diffing are timed separately, and so is the whole fused
+validation (validate_fused) with and without ``fleet_table``, which is what
+``--fleet-table`` switches in the scripts.
+"""
+
+import argparse
+import os
+import tempfile
+import time
+import tracemalloc
+
+from benchmarks.pipeline import fleet_paths
+from efs_validation.checks import compare_inventory_with_efs
+from efs_validation.efs import iter_efs_fixture_records, load_efs_servers
+from efs_validation.engine import validate_fused
+from efs_validation.fleet import HAVE_NUMPY, FleetTable
+from efs_validation.inventory import build_inventory_index, load_inventory
+
+
+def dict_build(efs_fixture, index):
+    return load_efs_servers(iter_efs_fixture_records(efs_fixture))
+
+
+def dict_diff(efs_servers, index):
+    return compare_inventory_with_efs(efs_servers, index.host_cells, index.host_group)
+
+
+def table_build(efs_fixture, index):
+    return FleetTable.build(iter_efs_fixture_records(efs_fixture), index)
+
+
+def table_diff(table, index):
+    return table.compare()
+
+
+def _best(func, args, repeat):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func(*args)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+
+def _measure(build, diff, efs_fixture, index, repeat):
+    build_time, model = _best(build, (efs_fixture, index), repeat)
+    diff_time, result = _best(diff, (model, index), repeat)
+    del model
+    # Peak while building and diffing, and what the model keeps allocated for the rest of the run
+    tracemalloc.start()
+    model = build(efs_fixture, index)
+    diff(model, index)
+    retained, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return build_time, diff_time, peak, retained, result
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--hosts", type=int, default=100_000, help="fleet size (default: 100000)")
+    parser.add_argument("--seed", type=int, default=0, help="fleet random seed (default: 0)")
+    parser.add_argument("--repeat", type=int, default=3, help="best-of repetitions (default: 3)")
+    args = parser.parse_args(argv)
+    if not HAVE_NUMPY:
+        raise SystemExit("numpy is not installed")
+
+    paths = fleet_paths(args.hosts, args.seed, os.path.join(tempfile.gettempdir(), 'efs_validation_fleets'))
+    index = build_inventory_index(load_inventory(paths['inventory_file']))
+
+    results = {
+        'dicts': _measure(dict_build, dict_diff, paths['efs_fixture'], index, args.repeat),
+        'fleet table': _measure(table_build, table_diff, paths['efs_fixture'], index, args.repeat),
+    }
+    if results['dicts'][-1] != results['fleet table'][-1]:
+        raise SystemExit("FleetTable disagrees with compare_inventory_with_efs")
+    efs_servers = dict_build(paths['efs_fixture'], index)
+    fused = {
+        'dicts': _best(validate_fused, (efs_servers, index), args.repeat),
+        'fleet table': _best(lambda: validate_fused(efs_servers, index, fleet_table=True), (), args.repeat),
+    }
+    if fused['dicts'][1] != fused['fleet table'][1]:
+        raise SystemExit("validate_fused disagrees with itself with fleet_table=True")
+
+    print(f"hosts:            {args.hosts}")
+    print(f"findings:         {sum(len(findings) for findings in results['dicts'][-1])}")
+    print(f"{'':14}{'build s':>10}{'diff s':>10}{'peak MiB':>10}{'kept MiB':>10}")
+    for name, (build_time, diff_time, peak, retained, _) in results.items():
+        print(f"{name:14}{build_time:>10.3f}{diff_time:>10.3f}{peak / 2**20:>10.1f}{retained / 2**20:>10.1f}")
+    print(f"{'':14}{'fused validation s':>20}")
+    for name, (seconds, _) in fused.items():
+        print(f"{name:14}{seconds:>20.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+"""Compare GroupResolver with the original per-pattern re.match loop."""
+
+import argparse
+import random
+import re
+import time
+
+from efs_validation.groups import PATTERN_TO_GROUP, UNKNOWN_GROUP, GroupResolver
+
+
+def legacy_determine_group(server_name):
+    """The loop the scripts used before GroupResolver."""
+    for pattern, group in PATTERN_TO_GROUP.items():
+        if re.match(pattern, server_name):
+            return group
+    return UNKNOWN_GROUP
+
+
+def generate_host_names(count, unknown_ratio=0.05, seed=0):
+    """Build realistic l<cc><site>efs... host names, a few of them unmapped."""
+    rng = random.Random(seed)
+    prefixes = [pattern[:-2] for pattern in PATTERN_TO_GROUP]
+    names = []
+    for i in range(count):
+        if rng.random() < unknown_ratio:
+            prefix = "lzzzz%02defs" % rng.randrange(100)
+        else:
+            prefix = rng.choice(prefixes)
+        names.append(f"{prefix}{rng.choice(('p', 'd'))}{i:06d}")
+    return names
+
+
+def _time(func, names, repeat):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = [func(name) for name in names]
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--hosts", type=int, default=100_000, help="number of host names (default: 100000)")
+    parser.add_argument("--repeat", type=int, default=3, help="best-of repetitions (default: 3)")
+    args = parser.parse_args(argv)
+
+    names = generate_host_names(args.hosts)
+
+    start = time.perf_counter()
+    resolver = GroupResolver(PATTERN_TO_GROUP)
+    build_time = time.perf_counter() - start
+
+    legacy_time, legacy_result = _time(legacy_determine_group, names, args.repeat)
+    resolver_time, resolver_result = _time(resolver.resolve, names, args.repeat)
+
+    if legacy_result != resolver_result:
+        raise SystemExit("GroupResolver disagrees with the re.match loop")
+
+    print(f"hosts:            {len(names)}")
+    print(f"resolver build:   {build_time * 1000:.3f} ms")
+    print(f"re.match loop:    {legacy_time:.3f} s")
+    print(f"GroupResolver:    {resolver_time:.3f} s")
+    print(f"speedup:          {legacy_time / resolver_time:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
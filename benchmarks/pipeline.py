@@ -0,0 +1,174 @@
+"""Time every stage of the validation pipeline on synthetic fleets.
+
+    python -m benchmarks.pipeline --sizes 1000,10000,100000 --json before.json
+    ... change something ...
+    python -m benchmarks.pipeline --sizes 1000,10000,100000 --compare before.json
+
+Each stage is timed on its own (best of --repeat runs) and then run once more
+under tracemalloc to record the peak memory it allocates. Fleets are
+generated once per size and seed by benchmarks.synthetic and reused, so
+results from different commits are comparable.
+"""
+
+import argparse
+import io
+import json
+import os
+import platform
+import resource
+import subprocess
+import tempfile
+import time
+import tracemalloc
+
+import yaml
+
+from benchmarks.synthetic import write_fleet
+from efs_validation.checks import (check_control_group_balance, check_servertype_placement, check_unassigned_servers,
+                                   compare_inventory_with_efs)
+from efs_validation.efs import iter_efs_fixture_records, load_efs_servers
+from efs_validation.engine import validate_fused
+from efs_validation.findings import Findings
+from efs_validation.inventory import build_inventory_index, decode_index, encode_index, extract_inventory, load_inventory
+from efs_validation.render import write_html_report, write_text_report
+
+# Bump when benchmarks.synthetic changes what it generates
+FLEET_VERSION = 1
+
+
+def fleet_paths(hosts, seed, fleet_dir):
+    out_dir = os.path.join(fleet_dir, f"v{FLEET_VERSION}-{hosts}-{seed}")
+    paths = {
+        'efs_fixture': os.path.join(out_dir, 'efs_display.txt'),
+        'inventory_file': os.path.join(out_dir, 'inventory.yaml'),
+    }
+    if not all(os.path.exists(path) for path in paths.values()):
+        write_fleet(hosts, out_dir, seed)
+    return paths
+
+
+def pipeline(paths, measure):
+    """Run every stage once through ``measure(stage, func, *args)``."""
+    efs_servers = measure('ingest', lambda: load_efs_servers(iter_efs_fixture_records(paths['efs_fixture'])))
+    data = measure('yaml_load', load_inventory, paths['inventory_file'])
+    measure('yaml_stream', extract_inventory, paths['inventory_file'])
+
+    index = measure('host_extraction', build_inventory_index, data)
+    measure('cached_index', decode_index, encode_index(index))  # What an unchanged inventory costs instead
+    server_cells, server_groups = index.host_cells, index.host_group
+    servertype_dev, servertype_prod = index.members('servertype_dev'), index.members('servertype_prod')
+    controlgroup_a, controlgroup_b = index.members('controlgroup_a'), index.members('controlgroup_b')
+    missing, extra, cells = measure('cell_diff', compare_inventory_with_efs, efs_servers, server_cells, server_groups)
+    servertype = measure('servertype', check_servertype_placement, efs_servers, servertype_dev, servertype_prod)
+    balance = measure('balance', lambda: check_control_group_balance(efs_servers, controlgroup_a, controlgroup_b)
+                      + check_unassigned_servers(efs_servers, controlgroup_a, controlgroup_b))
+    findings = Findings(missing, extra, cells, servertype, balance)
+    measure('fused_checks', validate_fused, efs_servers, index)
+
+    def render():
+        write_text_report(findings, io.StringIO())
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            write_html_report(findings, os.path.join(tmp_dir, 'report.html'))
+
+    measure('render', render)
+    return findings
+
+
+def time_stages(paths, repeat):
+    best = {}
+
+    def measure(stage, func, *args):
+        start = time.perf_counter()
+        result = func(*args)
+        elapsed = time.perf_counter() - start
+        best[stage] = min(elapsed, best.get(stage, elapsed))
+        return result
+
+    for _ in range(repeat):
+        findings = pipeline(paths, measure)
+    return best, len(findings)
+
+
+def trace_stages(paths):
+    peaks = {}
+
+    def measure(stage, func, *args):
+        tracemalloc.start()
+        try:
+            result = func(*args)
+            peaks[stage] = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+        return result
+
+    pipeline(paths, measure)
+    return peaks
+
+
+def git_revision():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def benchmark(sizes, seed=0, repeat=3, fleet_dir=None):
+    fleet_dir = fleet_dir or os.path.join(tempfile.gettempdir(), 'efs_validation_fleets')
+    results = {
+        'revision': git_revision(),
+        'python': platform.python_version(),
+        'libyaml': bool(getattr(yaml, '__with_libyaml__', False)),
+        'seed': seed,
+        'sizes': {},
+    }
+    for hosts in sizes:
+        paths = fleet_paths(hosts, seed, fleet_dir)
+        seconds, findings = time_stages(paths, repeat)
+        results['sizes'][str(hosts)] = {
+            'findings': findings,
+            'seconds': seconds,
+            'peak_bytes': trace_stages(paths),
+        }
+    results['max_rss_kb'] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return results
+
+
+def print_results(results, baseline=None):
+    print(f"revision {results['revision']}  python {results['python']}  libyaml {results['libyaml']}")
+    for hosts, size in results['sizes'].items():
+        base = (baseline or {}).get('sizes', {}).get(hosts)
+        print(f"\n{hosts} hosts, {size['findings']} findings")
+        print(f"  {'stage':<16}{'seconds':>10}{'peak MiB':>10}" + (f"{'vs base':>10}" if base else ""))
+        for stage, seconds in size['seconds'].items():
+            line = f"  {stage:<16}{seconds:>10.4f}{size['peak_bytes'].get(stage, 0) / 2**20:>10.1f}"
+            if base and base['seconds'].get(stage):
+                line += f"{seconds / base['seconds'][stage]:>9.2f}x"
+            print(line)
+    print(f"\nmax RSS {results['max_rss_kb'] / 1024:.1f} MiB")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the validation pipeline stages.")
+    parser.add_argument('--sizes', default='1000,10000,100000', help="comma separated fleet sizes (default: %(default)s)")
+    parser.add_argument('--seed', type=int, default=0, help="fleet random seed (default: 0)")
+    parser.add_argument('--repeat', type=int, default=3, help="timing runs per stage, best is kept (default: 3)")
+    parser.add_argument('--fleet-dir', help="where generated fleets are kept (default: a temp directory)")
+    parser.add_argument('--json', metavar='FILE', help="also write the results as JSON")
+    parser.add_argument('--compare', metavar='FILE', help="JSON results of an earlier run to compare against")
+    args = parser.parse_args(argv)
+
+    sizes = [int(size) for size in args.sizes.split(',')]
+    results = benchmark(sizes, args.seed, args.repeat, args.fleet_dir)
+    baseline = None
+    if args.compare:
+        with open(args.compare, 'r') as file:
+            baseline = json.load(file)
+    print_results(results, baseline)
+    if args.json:
+        with open(args.json, 'w') as file:
+            json.dump(results, file, indent=2)
+
+
+if __name__ == "__main__":
+    main()
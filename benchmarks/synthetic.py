@@ -0,0 +1,142 @@
+"""Generate synthetic EFS dumps and matching inventories for benchmarking.
+
+    python -m benchmarks.synthetic --hosts 10000 --out /tmp/fleet-10k
+
+writes efsservers.txt (server,cell,host_type), efs_display.txt (the table
+`efs display efsservers` prints) and inventory.yaml. Host names follow the
+real l<cc><site>efs... scheme of PATTERN_TO_GROUP, servers come in prod/dev
+pairs sitting in one to three cells and split between controlgroup_a and
+controlgroup_b, and a small share of the fleet is deliberately out of sync
+so every check has something to report.
+"""
+
+import argparse
+import os
+import random
+
+from efs_validation.groups import PATTERN_TO_GROUP
+
+# Share of hosts affected by each kind of drift
+DRIFT = {
+    'missing': 0.01,     # in EFS, not in the inventory
+    'extra': 0.01,       # in the inventory, not in EFS
+    'cells': 0.02,       # inventory cells differ from EFS
+    'servertype': 0.01,  # listed under the wrong servertype group
+    'unassigned': 0.01,  # in neither control group
+}
+
+CELLS_PER_SITE = 8
+
+
+def generate_fleet(hosts, seed=0):
+    """Return (efs_rows, inventory) for a fleet of ``hosts`` servers.
+
+    ``efs_rows`` is a list of (server, cell, host_type) and ``inventory`` a dict
+    of group -> {host: cells or None} in the order the groups are written.
+    """
+    rng = random.Random(seed)
+    sites = [(pattern[:-2], group) for pattern, group in PATTERN_TO_GROUP.items()]
+
+    servers = []  # each server's EFS rows, kept together so pairs share their last cell
+    site_groups = {group: {} for _, group in sites}
+    membership = {'servertype_dev': {}, 'servertype_prod': {}, 'controlgroup_a': {}, 'controlgroup_b': {}}
+
+    # Servers come in prod/dev pairs sharing a site, cells and control group
+    for i in range(hosts):
+        pair = i // 2
+        prefix, group = sites[pair % len(sites)]
+        site = group.rsplit('_', 1)[-1]
+        if i % 2 == 0:
+            pair_rng = random.Random(seed * 1_000_003 + pair)
+            cells = sorted(pair_rng.sample([f"{site}c{n:02d}" for n in range(CELLS_PER_SITE)], pair_rng.randint(1, 3)))
+            controlgroup = 'controlgroup_a' if (pair // len(sites)) % 2 == 0 else 'controlgroup_b'
+        host_type = 'prod' if i % 2 == 0 else 'dev'
+        server = f"{prefix}{host_type[0]}{i:06d}"
+
+        if rng.random() >= DRIFT['extra']:
+            servers.append([(server, cell, host_type) for cell in cells])
+        if rng.random() < DRIFT['missing']:
+            continue
+
+        inventory_cells = list(cells)
+        if rng.random() < DRIFT['cells']:
+            inventory_cells = inventory_cells[1:] or [f"{site}c{CELLS_PER_SITE:02d}"]
+        site_groups[group][server] = inventory_cells
+
+        servertype = 'servertype_' + host_type
+        if rng.random() < DRIFT['servertype']:
+            servertype = 'servertype_dev' if host_type == 'prod' else 'servertype_prod'
+        membership[servertype][server] = None
+        if rng.random() >= DRIFT['unassigned']:
+            membership[controlgroup][server] = None
+
+    rng.shuffle(servers)
+    efs_rows = [row for rows in servers for row in rows]
+    # Membership groups come first so the l_* group is each host's last (and primary) listing
+    inventory = dict(membership)
+    inventory.update(site_groups)
+    return efs_rows, inventory
+
+
+def write_efs_file(efs_rows, path):
+    with open(path, 'w') as file:
+        for server, cell, host_type in efs_rows:
+            file.write(f"{server},{cell},{host_type}\n")
+
+
+def write_efs_display(efs_rows, path):
+    """Write the rows the way `efs display efsservers` prints them."""
+    with open(path, 'w') as file:
+        file.write("EFS Servers\n")
+        file.write(f"{'CELL':<16}{'SERVER':<24}TYPE\n")
+        file.write(f"{'=' * 15} {'=' * 23} ====\n")
+        for server, cell, host_type in efs_rows:
+            file.write(f"{cell:<16}{server:<24}{host_type}\n")
+
+
+def write_inventory(inventory, path):
+    """Write the inventory YAML directly; yaml.dump is far too slow at 100k hosts."""
+    with open(path, 'w') as file:
+        file.write("all:\n  children:\n")
+        for group, hosts in inventory.items():
+            file.write(f"    {group}:\n")
+            if not hosts:
+                file.write("      hosts: {}\n")
+                continue
+            file.write("      hosts:\n")
+            for host, cells in hosts.items():
+                if cells is None:
+                    file.write(f"        {host}: {{}}\n")
+                else:
+                    file.write(f"        {host}:\n          ansible_host: {host}.example.net\n          cells:\n")
+                    for cell in cells:
+                        file.write(f"          - {cell}\n")
+
+
+def write_fleet(hosts, out_dir, seed=0):
+    """Generate a fleet into ``out_dir`` and return the paths written."""
+    os.makedirs(out_dir, exist_ok=True)
+    efs_rows, inventory = generate_fleet(hosts, seed)
+    paths = {
+        'efs_file': os.path.join(out_dir, 'efsservers.txt'),
+        'efs_fixture': os.path.join(out_dir, 'efs_display.txt'),
+        'inventory_file': os.path.join(out_dir, 'inventory.yaml'),
+    }
+    write_efs_file(efs_rows, paths['efs_file'])
+    write_efs_display(efs_rows, paths['efs_fixture'])
+    write_inventory(inventory, paths['inventory_file'])
+    return paths
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Generate a synthetic EFS dump and inventory.")
+    parser.add_argument('--hosts', type=int, default=10_000, help="fleet size (default: 10000)")
+    parser.add_argument('--seed', type=int, default=0, help="random seed (default: 0)")
+    parser.add_argument('--out', required=True, help="output directory")
+    args = parser.parse_args(argv)
+    for path in write_fleet(args.hosts, args.out, args.seed).values():
+        print(path)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+"""Compare the event-stream inventory extractor with the full YAML load, in time and memory.
+
+Both read the same synthetic inventory and are indexed afterwards to check
+they agree; only reading the YAML is timed and traced.
+"""
+
+import argparse
+import os
+import tempfile
+import time
+import tracemalloc
+
+from benchmarks.pipeline import fleet_paths
+from efs_validation.inventory import SafeLoader, build_inventory_index, extract_inventory, load_inventory
+
+
+def _index_key(index):
+    return tuple(list(mapping.items())
+                 for mapping in (index.group_hosts, index.host_groups, index.host_cells, index.host_group))
+
+
+def _measure(load, inventory_file, repeat):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        load(inventory_file)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    tracemalloc.start()
+    inventory = load(inventory_file)
+    retained, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return best, peak, retained, _index_key(build_inventory_index(inventory))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--hosts", type=int, default=100_000, help="fleet size (default: 100000)")
+    parser.add_argument("--seed", type=int, default=0, help="fleet random seed (default: 0)")
+    parser.add_argument("--repeat", type=int, default=3, help="best-of repetitions (default: 3)")
+    args = parser.parse_args(argv)
+
+    paths = fleet_paths(args.hosts, args.seed, os.path.join(tempfile.gettempdir(), 'efs_validation_fleets'))
+    results = {
+        'full load': _measure(load_inventory, paths['inventory_file'], args.repeat),
+        'event stream': _measure(extract_inventory, paths['inventory_file'], args.repeat),
+    }
+    if results['full load'][-1] != results['event stream'][-1]:
+        raise SystemExit("The event stream extractor disagrees with the full load")
+
+    print(f"hosts:            {args.hosts}")
+    print(f"inventory:        {os.path.getsize(paths['inventory_file']) / 2**20:.1f} MiB")
+    print(f"loader:           {SafeLoader.__name__}")
+    print(f"{'':14}{'load s':>10}{'peak MiB':>10}{'kept MiB':>10}")
+    for name, (seconds, peak, retained, _) in results.items():
+        print(f"{name:14}{seconds:>10.3f}{peak / 2**20:>10.1f}{retained / 2**20:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,13 @@
+#!/usr/bin/env python3
+import os
+import sys
+
+from efs_validation.dynamic import main
+
+# Define script directory
+script_dir = os.path.dirname(os.path.abspath(__file__))
+inventory_file = os.path.join(script_dir, 'inventory.prod.yaml')
+
+
+if __name__ == "__main__":
+    sys.exit(main(inventory_file=inventory_file))
@@ -0,0 +1,13 @@
+"""Shared helpers for the EFS inventory validation scripts.
+
+Importing the package has no side effects: EFS is only queried and the
+inventory only parsed when a validation is actually run, either through
+:func:`run` or a long-lived :class:`ValidationSession`.
+"""
+
+from efs_validation.efs import EfsSource
+from efs_validation.groups import PATTERN_TO_GROUP, GroupResolver, determine_group_from_pattern, group_resolver
+from efs_validation.session import ValidationSession, run
+
+__all__ = ['EfsSource', 'PATTERN_TO_GROUP', 'GroupResolver', 'determine_group_from_pattern', 'group_resolver',
+           'ValidationSession', 'run']
@@ -0,0 +1,242 @@
+"""Validate several inventories against one EFS query.
+
+EFS is queried once in the parent process; each inventory is then parsed and
+validated in a separate worker process (YAML parsing is CPU bound, so threads
+would serialize on the GIL). The findings are merged into one report keyed by
+inventory. ``--sequential`` validates them one after another in this process
+instead, and ``--compare-sequential`` times such a pass before the parallel one
+to report the speedup.
+
+    python -m efs_validation.batch inventory-lab.yaml inventory.prod.yaml inventory.emea.yaml
+"""
+
+import argparse
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+
+from efs_validation.cache import CACHE_DIR_ENV, cache_dir
+from efs_validation.cli import (add_efs_arguments, add_inventory_arguments, add_profile_arguments,
+                                efs_source_from_args, profile_from_args)
+from efs_validation.efs import EfsSnapshot
+from efs_validation.incremental import validate_incremental
+from efs_validation.profiling import DISABLED, Profile
+from efs_validation.render import SEPARATOR, write_text_report
+from efs_validation.session import ValidationSession
+
+# EFS data shared with every task of a worker process, set by _init_worker
+_worker_efs = None
+
+
+@dataclass
+class InventoryResult:
+    inventory_file: str
+    findings: object
+    stats: object
+    parse_seconds: float
+    seconds: float
+    cache_status: str = 'off'
+    profile: dict = None        # Profile.as_dict() of the validation, taken in the process that ran it
+    profile_lines: list = None  # and its footer_lines()
+
+
+@dataclass
+class BatchResult:
+    results: dict = field(default_factory=dict)  # inventory file -> InventoryResult, in request order
+    efs_seconds: float = 0.0
+    wall_seconds: float = 0.0
+    efs_description: str = ""
+    sequential: bool = False        # validated one after another in this process rather than in workers
+    sequential_seconds: float = None  # EFS query plus a measured pass one after another, if one was timed
+
+    @property
+    def inventory_seconds(self):
+        """The per-inventory validation times added up; in workers they were taken while competing for CPU."""
+        return sum(result.seconds for result in self.results.values())
+
+    def summary(self):
+        statuses = [result.cache_status for result in self.results.values()]
+        cache = f"inventory cache {statuses.count('hit')} hits, {statuses.count('miss')} misses"
+        if self.sequential:
+            return (f"Validated {len(self.results)} inventories one after another in {self.wall_seconds:.3f}s "
+                    f"(EFS query {self.efs_seconds:.3f}s; {cache})")
+        if self.sequential_seconds is not None:
+            speedup = self.sequential_seconds / self.wall_seconds if self.wall_seconds else 0.0
+            timing = f"one after another {self.sequential_seconds:.3f}s, speedup {speedup:.1f}x"
+        else:
+            timing = (f"per-inventory times add up to {self.inventory_seconds:.3f}s, an overestimate of running "
+                      f"them one after another, which --compare-sequential measures")
+        return (f"Validated {len(self.results)} inventories in {self.wall_seconds:.3f}s "
+                f"(EFS query {self.efs_seconds:.3f}s; {timing}; {cache})")
+
+
+def _init_worker(efs_source, efs_servers, fetched_at, from_cache):
+    global _worker_efs
+    _worker_efs = (efs_source, efs_servers, fetched_at, from_cache)
+
+
+def validate_inventory(inventory_file, full=False, inventory_cache=False, inventory_parser='stream', group_map=None,
+                       profile=False):
+    """Validate one inventory against the EFS data of this worker, profiling its stages if ``profile``."""
+    start = time.perf_counter()
+    efs_source, efs_servers, fetched_at, from_cache = _worker_efs
+    session = ValidationSession(inventory_file, efs_source, Profile(enabled=profile), inventory_cache=inventory_cache,
+                                inventory_parser=inventory_parser, group_map=group_map)
+    session.efs = EfsSnapshot.from_servers(efs_source, efs_servers, fetched_at, from_cache)
+    findings, stats = validate_incremental(session, full=full)
+    result = InventoryResult(inventory_file, findings, stats, session.inventory.parse_seconds,
+                             time.perf_counter() - start, session.inventory.cache_status)
+    if profile:
+        result.profile, result.profile_lines = session.profile.as_dict(), session.profile.footer_lines()
+    return result
+
+
+def duplicate_inventories(inventory_files):
+    """The inventory files given more than once, however their paths are spelled."""
+    seen = set()
+    duplicates = []
+    for inventory_file in inventory_files:
+        path = os.path.realpath(inventory_file)
+        if path in seen:
+            duplicates.append(inventory_file)
+        seen.add(path)
+    return duplicates
+
+
+def time_sequential(tasks, efs_data):
+    """Seconds to run ``tasks`` one after another in this process, against a throwaway copy of the cache directory.
+
+    The copy keeps the saved states and inventory indexes as they are, so the
+    pass that runs after this one starts from the same point.
+    """
+    previous = os.environ.get(CACHE_DIR_ENV)
+    with tempfile.TemporaryDirectory() as scratch:
+        scratch_cache = os.path.join(scratch, 'cache')
+        shutil.copytree(cache_dir(), scratch_cache)
+        os.environ[CACHE_DIR_ENV] = scratch_cache
+        try:
+            _init_worker(*efs_data)
+            start = time.perf_counter()
+            for task in tasks:
+                validate_inventory(*task)
+            return time.perf_counter() - start
+        finally:
+            if previous is None:
+                del os.environ[CACHE_DIR_ENV]
+            else:
+                os.environ[CACHE_DIR_ENV] = previous
+
+
+def run_batch(inventory_files, efs_source=None, jobs=None, full=False, inventory_cache=False,
+              inventory_parser='stream', group_map=None, sequential=False, compare_sequential=False,
+              profile=DISABLED):
+    """Query EFS once and validate every inventory in a pool of ``jobs`` processes, or one after another.
+
+    With ``compare_sequential`` a pass one after another is timed first, for
+    the speedup in the summary.
+    """
+    duplicates = duplicate_inventories(inventory_files)
+    if duplicates:
+        raise ValueError(f"inventories given more than once: {', '.join(duplicates)}")
+    start = time.perf_counter()
+    efs = EfsSnapshot(efs_source)
+    with profile.stage('efs_query'):
+        efs_servers = efs.servers
+    batch = BatchResult(efs_seconds=time.perf_counter() - start, efs_description=efs.describe(), sequential=sequential)
+    efs_data = (efs.source, efs_servers, efs.fetched_at, efs.from_cache)
+    tasks = [(inventory_file, full, inventory_cache, inventory_parser, group_map, profile.enabled)
+             for inventory_file in inventory_files]
+    if compare_sequential and not sequential:
+        with profile.stage('sequential_comparison'):
+            batch.sequential_seconds = batch.efs_seconds + time_sequential(tasks, efs_data)
+        start = time.perf_counter() - batch.efs_seconds  # Wall-clock time counts the EFS query, not the comparison
+
+    with profile.stage('validate_inventories'):
+        if sequential:
+            _init_worker(*efs_data)
+            results = [validate_inventory(*task) for task in tasks]
+        else:
+            jobs = jobs or min(len(inventory_files), os.cpu_count() or 1)
+            with ProcessPoolExecutor(max_workers=jobs, initializer=_init_worker, initargs=efs_data) as pool:
+                results = [future.result() for future in [pool.submit(validate_inventory, *task) for task in tasks]]
+    for result in results:
+        batch.results[result.inventory_file] = result
+
+    batch.wall_seconds = time.perf_counter() - start
+    if profile.enabled:
+        profile.count('inventories', len(batch.results))
+        profile.count('efs_servers', len(efs_servers))
+        profile.count('efs_cells', len({cell for server in efs_servers.values() for cell in server.cells}))
+        profile.count('findings', sum(len(result.findings) for result in results))
+    return batch
+
+
+def write_batch_text_report(batch, output):
+    """Write one text report section per inventory."""
+    output.write(f"{batch.efs_description}\n\n")
+    for inventory_file, result in batch.results.items():
+        output.write(f"{SEPARATOR}\nInventory: {inventory_file}\n")
+        output.write(f"{result.stats}; parsed in {result.parse_seconds:.3f}s (inventory cache {result.cache_status}), "
+                     f"validated in {result.seconds:.3f}s\n")
+        output.write(f"{SEPARATOR}\n\n")
+        write_text_report(result.findings, output)
+        if result.profile_lines:
+            output.write(f"{SEPARATOR}\n" + "\n".join(result.profile_lines) + "\n\n")
+
+
+def write_batch_profile_json(batch, profile, path):
+    """The batch's own stages and counters, with each inventory's under ``inventories``."""
+    if not profile.enabled:
+        return
+    with open(path, 'w') as file:
+        json.dump({**profile.as_dict(), 'inventories': {inventory_file: result.profile
+                                                        for inventory_file, result in batch.results.items()}},
+                  file, indent=2)
+        file.write("\n")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Validate several inventories against a single EFS query.")
+    parser.add_argument('inventories', nargs='+', metavar='INVENTORY', help="Ansible inventory files to validate")
+    add_efs_arguments(parser)
+    add_inventory_arguments(parser)
+    parser.add_argument('--jobs', '-j', type=int, help="worker processes (default: one per inventory, up to the CPU count)")
+    mode = parser.add_mutually_exclusive_group()
+    mode.add_argument('--sequential', action='store_true',
+                      help="validate the inventories one after another in this process instead")
+    mode.add_argument('--compare-sequential', action='store_true',
+                      help="also time validating them one after another first, and report the speedup")
+    parser.add_argument('--full', action='store_true',
+                        help="re-check every host instead of only those changed since the last run")
+    parser.add_argument('--output', metavar='FILE', help="write the combined report here instead of stdout")
+    add_profile_arguments(parser)
+    args = parser.parse_args(argv)
+    profile = profile_from_args(args)
+
+    try:
+        batch = profile.call(run_batch, args.inventories, efs_source_from_args(args), jobs=args.jobs, full=args.full,
+                             inventory_cache=args.inventory_cache, inventory_parser=args.inventory_parser,
+                             group_map=args.group_map, sequential=args.sequential,
+                             compare_sequential=args.compare_sequential, profile=profile)
+    except ValueError as e:  # Repeated inventories, or a bad group map
+        parser.error(str(e))
+    with profile.stage('render'):
+        if args.output:
+            with open(args.output, 'w') as output:
+                write_batch_text_report(batch, output)
+        else:
+            write_batch_text_report(batch, sys.stdout)
+    footer = profile.footer_lines()
+    if footer:
+        print("Batch " + "\n".join(footer), file=sys.stdout if args.output else sys.stderr)
+    print(batch.summary(), file=sys.stdout if args.output else sys.stderr)
+    write_batch_profile_json(batch, profile, args.profile_json)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,54 @@
+import hashlib
+import os
+import pickle
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:  # Not available on Windows; runs there simply don't coordinate
+    fcntl = None
+
+# Where state carried between runs is kept; override with EFS_VALIDATION_CACHE_DIR
+CACHE_DIR_ENV = 'EFS_VALIDATION_CACHE_DIR'
+
+
+def cache_dir():
+    path = os.environ.get(CACHE_DIR_ENV) or os.path.join(os.path.expanduser('~'), '.cache', 'efs_validation')
+    os.makedirs(path, exist_ok=True)
+    return path
+
+
+def cache_path(kind, *key):
+    """Path of the cache file of the given kind for ``key`` (any strs)."""
+    digest = hashlib.sha256('\0'.join(key).encode()).hexdigest()[:16]
+    return os.path.join(cache_dir(), f"{kind}-{digest}")
+
+
+@contextmanager
+def file_lock(path):
+    """Hold an exclusive lock on ``path`` (created if needed) for the ``with`` block."""
+    with open(path, 'a') as lock_file:
+        if fcntl is not None:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+def load_pickle(path):
+    """The object pickled at ``path``, or None if it is missing or unreadable."""
+    try:
+        with open(path, 'rb') as file:
+            return pickle.load(file)
+    except (OSError, pickle.UnpicklingError, EOFError, AttributeError, ImportError):
+        return None
+
+
+def save_pickle(path, value):
+    """Pickle ``value`` to ``path`` atomically, so readers never see a partial file."""
+    tmp_file = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_file, 'wb') as file:
+        pickle.dump(value, file, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(tmp_file, path)
@@ -0,0 +1,71 @@
+"""Per-cell control group balance over every cell a server is in.
+
+Servers and cells are interned to integer ids and every (cell, server) pair
+is stored once, with the server's control group / host type slot, in three
+parallel arrays. The dev/prod tally of every cell is then a single counting
+pass over those arrays, and server names are only looked up again for the
+cells that turn out to be unbalanced.
+"""
+
+from array import array
+from collections import Counter
+from itertools import compress, repeat
+from operator import add, mul
+
+from efs_validation.findings import ControlGroupImbalance
+
+# Slot of each control group / host type pair in a cell's tally
+SLOTS = {
+    ('controlgroup_a', 'dev'): 0, ('controlgroup_a', 'prod'): 1,
+    ('controlgroup_b', 'dev'): 2, ('controlgroup_b', 'prod'): 3,
+}
+
+
+class CellIndex:
+    """cell -> control group / host type -> server ids, as parallel arrays."""
+
+    def __init__(self):
+        self.server_names = []  # server id -> name, in the order servers were added
+        self.cell_ids = {}      # cell -> id, in first-seen order
+        self.edge_cells = array('I')
+        self.edge_servers = array('I')
+        self.edge_slots = array('B')
+
+    def add(self, server_name, cells, slot):
+        """Record ``server_name`` in ``slot`` (see SLOTS) of each of its cells."""
+        server_id = len(self.server_names)
+        self.server_names.append(server_name)
+        cell_ids = self.cell_ids
+        for cell in sorted(cells) if len(cells) > 1 else cells:
+            cell_id = cell_ids.get(cell)
+            if cell_id is None:
+                cell_id = cell_ids[cell] = len(cell_ids)
+            self.edge_cells.append(cell_id)
+            self.edge_servers.append(server_id)
+            self.edge_slots.append(slot)
+
+    def tally(self):
+        """Flat counts where ``tally[cell_id * 4 + slot]`` is the number of servers in that slot."""
+        counts = array('I', [0]) * (4 * len(self.cell_ids))
+        for key, count in Counter(map(add, map(mul, self.edge_cells, repeat(4)), self.edge_slots)).items():
+            counts[key] = count
+        return counts
+
+    def imbalances(self):
+        """A ControlGroupImbalance for every cell whose dev and prod counts differ within a control group."""
+        counts = self.tally()
+        unbalanced = {cell_id for cell_id in range(len(self.cell_ids))
+                      if counts[4 * cell_id] != counts[4 * cell_id + 1]
+                      or counts[4 * cell_id + 2] != counts[4 * cell_id + 3]}
+        if not unbalanced:
+            return []
+
+        members = {cell_id: ([], [], [], []) for cell_id in sorted(unbalanced)}
+        names = self.server_names
+        edges = zip(self.edge_cells, self.edge_servers, self.edge_slots)
+        for cell_id, server_id, slot in compress(edges, map(unbalanced.__contains__, self.edge_cells)):
+            members[cell_id][slot].append(names[server_id])
+
+        cells = list(self.cell_ids)
+        return [ControlGroupImbalance(cells[cell_id], tuple(a_dev), tuple(a_prod), tuple(b_dev), tuple(b_prod))
+                for cell_id, (a_dev, a_prod, b_dev, b_prod) in members.items()]
@@ -0,0 +1,78 @@
+from efs_validation.cellindex import SLOTS, CellIndex
+from efs_validation.findings import (CellMismatch, ExtraServer, MissingServer,
+                                     ServertypeMismatch, UnassignedServers)
+from efs_validation.groups import UNKNOWN_GROUP, determine_group_from_pattern
+
+
+def check_servertype_placement(efs_servers, servertype_dev, servertype_prod):
+    """Find servers whose EFS host type contradicts their servertype group."""
+    mismatches = []
+
+    # Validate server placement
+    for server_name, server in efs_servers.items():
+        host_type = server.host_type
+        if server_name in servertype_dev and host_type != 'dev':
+            mismatches.append(ServertypeMismatch(server_name, host_type, 'servertype_dev', 'servertype_prod'))
+        elif server_name in servertype_prod and host_type != 'prod':
+            mismatches.append(ServertypeMismatch(server_name, host_type, 'servertype_prod', 'servertype_dev'))
+
+    return mismatches
+
+
+def check_control_group_balance(efs_servers, controlgroup_a, controlgroup_b):
+    """Check that every data center has as many dev as prod servers in each control group.
+
+    A server counts towards every cell EFS reports it in.
+    """
+    cell_index = CellIndex()
+    for server_name, server in efs_servers.items():
+        # Identify control group
+        if server_name in controlgroup_a:
+            slot = SLOTS.get(('controlgroup_a', server.host_type))
+        elif server_name in controlgroup_b:
+            slot = SLOTS.get(('controlgroup_b', server.host_type))
+        else:
+            continue  # Skip if the server is not part of any control group
+        if slot is not None:
+            cell_index.add(server_name, server.cells, slot)
+    return cell_index.imbalances()
+
+
+def check_unassigned_servers(efs_servers, controlgroup_a, controlgroup_b):
+    """Every unique EFS server should be assigned to controlgroup_a or controlgroup_b."""
+    unassigned_servers = tuple(server for server in efs_servers
+                               if server not in controlgroup_a and server not in controlgroup_b)
+    if unassigned_servers:
+        return [UnassignedServers(len(efs_servers), unassigned_servers)]
+    return []
+
+
+def compare_inventory_with_efs(efs_servers, server_cells_in_inventory, server_groups_in_inventory,
+                               resolve_group=determine_group_from_pattern):
+    """Find missing and extra servers and cell mismatches between EFS and the inventory.
+
+    ``resolve_group`` suggests the group of a missing server.
+    """
+    missing_servers = []
+    extra_servers = []
+    cell_mismatches = []
+
+    # Validate EFS servers against the inventory
+    for server_name, server in efs_servers.items():
+        if server_name not in server_cells_in_inventory:
+            # If the server is missing, suggest it might be a new server and infer the group
+            missing_servers.append(MissingServer(server_name, resolve_group(server_name)))
+        else:
+            expected_cells = frozenset(server.cells)
+            inventory_cells = frozenset(server_cells_in_inventory[server_name])
+            # Check if there are mismatches between expected and actual cells
+            if expected_cells != inventory_cells:
+                group = server_groups_in_inventory.get(server_name, UNKNOWN_GROUP)
+                cell_mismatches.append(CellMismatch(server_name, group, expected_cells, inventory_cells))
+
+    # Check for extra servers in the inventory that are not in EFS
+    for server_name in server_cells_in_inventory:
+        if server_name not in efs_servers:
+            extra_servers.append(ExtraServer(server_name, server_groups_in_inventory.get(server_name, UNKNOWN_GROUP)))
+
+    return missing_servers, extra_servers, cell_mismatches
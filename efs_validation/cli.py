@@ -0,0 +1,115 @@
+import argparse
+import os
+import shlex
+import sys
+
+from efs_validation.efs import DEFAULT_EFS_TTL, EFS_COMMAND, EFS_TTL_ENV, EfsSource
+from efs_validation.fleet import HAVE_NUMPY
+from efs_validation.groups import GROUP_MAP_ENV
+from efs_validation.incremental import validate_incremental
+from efs_validation.inventory import INVENTORY_PARSERS
+from efs_validation.profiling import Profile
+from efs_validation.render import FINDINGS_FORMATS, open_findings_writer, write_findings
+from efs_validation.session import ValidationSession
+
+
+def add_efs_arguments(parser):
+    """Options selecting where EFS server records are read from."""
+    source = parser.add_mutually_exclusive_group()
+    source.add_argument('--efs-command', default=' '.join(EFS_COMMAND),
+                        help="command that prints the EFS server table (default: %(default)s)")
+    source.add_argument('--efs-fixture', metavar='FILE',
+                        help="read a recorded copy of the EFS server table instead of running EFS")
+    source.add_argument('--efs-file', metavar='FILE',
+                        help="read server,cell,host_type rows from an efsservers.txt file")
+    parser.add_argument('--efs-ttl', type=float, metavar='SECONDS',
+                        default=float(os.environ.get(EFS_TTL_ENV, DEFAULT_EFS_TTL)),
+                        help="reuse an EFS query result another run made less than this long ago, "
+                             "0 to always query (default: %(default)s)")
+    parser.add_argument('--refresh', action='store_true',
+                        help="query EFS even if a cached result is still fresh")
+
+
+def add_inventory_arguments(parser):
+    """Options controlling how the inventory YAML is read."""
+    parser.add_argument('--no-inventory-cache', dest='inventory_cache', action='store_false',
+                        help="always parse the inventory YAML instead of reusing the index of an unchanged file")
+    parser.add_argument('--inventory-parser', choices=INVENTORY_PARSERS, default=INVENTORY_PARSERS[0],
+                        help="'stream' reads only groups, hosts and cells from the YAML events, "
+                             "'full' loads the whole document (default: %(default)s)")
+    parser.add_argument('--group-map', metavar='FILE',
+                        help="YAML file of 'host-name pattern: group' entries for suggesting where missing "
+                             f"servers go, ahead of the built-in ones (default: ${GROUP_MAP_ENV} if set)")
+
+
+def add_findings_arguments(parser):
+    """Options for the machine-readable per-finding output."""
+    parser.add_argument('--findings', metavar='FILE',
+                        help="also write one JSONL or CSV record per finding to FILE, "
+                             "each as soon as it is found")
+    parser.add_argument('--findings-format', choices=FINDINGS_FORMATS,
+                        help="format of --findings (default: csv for a .csv file, else jsonl)")
+
+
+def add_profile_arguments(parser):
+    """Options switching on the stage timings and counters."""
+    parser.add_argument('--profile', action='store_true',
+                        help="time each stage, count hosts, cells and findings, and add them to the report")
+    parser.add_argument('--profile-json', metavar='FILE', default='validation_profile.json',
+                        help="where --profile writes its JSON (default: %(default)s)")
+    parser.add_argument('--cprofile', metavar='FILE',
+                        help="also dump cProfile stats of the validation itself to FILE (implies --profile)")
+
+
+def build_parser(description, inventory_file):
+    """Argument parser shared by the validation scripts."""
+    parser = argparse.ArgumentParser(description=description)
+    parser.add_argument('--inventory', default=inventory_file,
+                        help=f"Ansible inventory to validate (default: {inventory_file})")
+    add_efs_arguments(parser)
+    add_inventory_arguments(parser)
+    parser.add_argument('--full', action='store_true',
+                        help="re-check every host instead of only those changed since the last run")
+    parser.add_argument('--state-file', metavar='FILE',
+                        help="where the previous run's data and findings are kept (default: under the cache directory)")
+    parser.add_argument('--fleet-table', action='store_true',
+                        help="diff EFS against the inventory with numpy arrays on a full run (needs numpy, "
+                             "otherwise the default dict diff is used)")
+    add_findings_arguments(parser)
+    add_profile_arguments(parser)
+    return parser
+
+
+def efs_source_from_args(args):
+    return EfsSource(command=shlex.split(args.efs_command), fixture=args.efs_fixture, efs_file=args.efs_file,
+                     ttl=args.efs_ttl, refresh=args.refresh)
+
+
+def profile_from_args(args):
+    return Profile(enabled=args.profile or args.cprofile is not None, cprofile_file=args.cprofile)
+
+
+def run_script(description, inventory_file, render, argv=None):
+    """What every validation script does: parse its options, validate incrementally and render the findings.
+
+    ``render(findings, profile, notes)`` writes the script's own reports, in the
+    profiled 'render' stage; ``inventory_file`` is the script's default inventory.
+    """
+    args = build_parser(description, inventory_file).parse_args(argv)
+    profile = profile_from_args(args)
+    if args.fleet_table and not HAVE_NUMPY:
+        print("numpy is not installed, --fleet-table falls back to the dict diff", file=sys.stderr)
+    with open_findings_writer(args.findings, args.findings_format) as write_finding:
+        session = ValidationSession(args.inventory, efs_source_from_args(args), profile, args.inventory_cache,
+                                    args.inventory_parser, write_finding, args.group_map, args.fleet_table)
+        findings, stats = profile.call(validate_incremental, session, args.state_file, full=args.full)
+        if write_finding is not None and not stats.full:
+            write_findings(findings, write_finding)  # Only a full run streams them as it goes
+    print(f"Parsed {args.inventory} in {session.inventory.parse_seconds:.3f}s "
+          f"(inventory cache {session.inventory.cache_status})")
+    print(stats)
+    notes = [session.efs.describe()]
+    with profile.stage('render'):
+        render(findings, profile, notes)
+    profile.write_json(args.profile_json)
+    return findings
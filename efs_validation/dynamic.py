@@ -0,0 +1,202 @@
+"""Serve the inventory to Ansible as a dynamic inventory, from the cached and validated model.
+
+    ansible-playbook -i dynamic_inventory.py copy_bash_profile.yaml
+    python -m efs_validation.dynamic --inventory inventory.prod.yaml --list
+
+The first call loads the inventory YAML, validates it against EFS and turns
+it into Ansible's JSON, with each host's EFS cells and host type added as
+``efs_cells`` and ``efs_host_type``. That JSON is cached, so while the
+inventory file is unchanged and the EFS data is fresh, ``--list`` and
+``--host`` only print what was cached.
+
+With ``--strict`` (or ``EFS_VALIDATION_STRICT=1``) nothing is served while the
+validation has blocking findings, servertype and control group placement by
+default, so a misplaced server never reaches a play. Ansible only passes
+``--list`` or ``--host``; point it at another inventory with
+``EFS_VALIDATION_INVENTORY``.
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+
+from efs_validation.cache import cache_path, load_pickle, save_pickle
+from efs_validation.cli import add_efs_arguments, efs_source_from_args
+from efs_validation.findings import SECTIONS
+from efs_validation.groups import GROUP_MAP_ENV
+from efs_validation.incremental import validate_incremental
+from efs_validation.session import ValidationSession
+
+INVENTORY_ENV = 'EFS_VALIDATION_INVENTORY'
+STRICT_ENV = 'EFS_VALIDATION_STRICT'
+
+# Finding sections that stop --strict from serving the inventory
+BLOCKING_SECTIONS = ('servertype_mismatches', 'controlgroup_mismatches')
+
+# Bump whenever the cached layout or the JSON served changes
+DYNAMIC_CACHE_VERSION = 1
+
+# How many blocking findings a refusal quotes
+QUOTED_FINDINGS = 5
+
+
+def ansible_inventory(inventory, efs_servers):
+    """(groups, hostvars) of a loaded inventory document in Ansible's dynamic inventory layout.
+
+    Groups are walked in document order; a host's vars from later listings
+    override earlier ones, as when Ansible reads the YAML itself.
+    """
+    groups = {}
+    group_members = {}
+    hostvars = {}
+    root = inventory.get('all') if isinstance(inventory, dict) else None
+    stack = [('all', root)]
+    while stack:
+        name, data = stack.pop()
+        group = groups.get(name)
+        if group is None:
+            group = groups[name] = {'hosts': [], 'vars': {}, 'children': []}
+            group_members[name] = set()
+        if not isinstance(data, dict):
+            continue
+        hosts = data.get('hosts')
+        if isinstance(hosts, dict):
+            members = group_members[name]
+            for host, host_vars in hosts.items():
+                if host not in members:
+                    members.add(host)
+                    group['hosts'].append(host)
+                merged = hostvars.setdefault(host, {})
+                if isinstance(host_vars, dict):
+                    merged.update(host_vars)
+        if isinstance(data.get('vars'), dict):
+            group['vars'].update(data['vars'])
+        children = data.get('children')
+        if isinstance(children, dict):
+            group['children'] += [child for child in children if child not in group['children']]
+            stack.extend(reversed(children.items()))
+
+    for host, merged in hostvars.items():
+        server = efs_servers.get(host)
+        if server is not None:
+            merged['efs_cells'] = sorted(server.cells)
+            merged['efs_host_type'] = server.host_type
+    return groups, hostvars
+
+
+def blocking_findings(findings, sections=BLOCKING_SECTIONS):
+    """The findings of ``sections``, in report order."""
+    return [finding for attribute, _, _ in SECTIONS if attribute in sections
+            for finding in getattr(findings, attribute)]
+
+
+def refusal(blocking):
+    """Why the inventory is not served, quoting the first few blocking findings."""
+    lines = [f"Refusing to serve the inventory: validation has {len(blocking)} blocking findings"]
+    for finding in blocking[:QUOTED_FINDINGS]:
+        lines += ["  " + line for line in finding.lines()]
+    if len(blocking) > QUOTED_FINDINGS:
+        lines.append(f"  ... and {len(blocking) - QUOTED_FINDINGS} more")
+    return "\n".join(lines)
+
+
+def _encode(value):
+    return json.dumps(value, separators=(',', ':'), default=str).encode()
+
+
+def _file_key(path):
+    stat = os.stat(path)
+    return os.path.abspath(path), stat.st_mtime_ns, stat.st_size
+
+
+def inputs_key(source):
+    """What a cached response depends on besides the inventory: the EFS file and the group map file, if any."""
+    efs_file = source.efs_file or source.fixture
+    group_map = os.environ.get(GROUP_MAP_ENV)
+    return (_file_key(efs_file) if efs_file is not None else None,
+            _file_key(group_map) if group_map else None)
+
+
+def _cache_paths(inventory_file, source, sections, strict):
+    key = (os.path.abspath(inventory_file), str(source), ','.join(sections), str(strict))
+    return cache_path('dynamic', *key), cache_path('dynamic-hosts', *key)
+
+
+def load_response(inventory_file, source, sections, strict):
+    """The cached (refusal, list JSON, hostvars path) if still valid for the inventory and EFS data, else None."""
+    list_path, hosts_path = _cache_paths(inventory_file, source, sections, strict)
+    entry = load_pickle(list_path)
+    if not (isinstance(entry, tuple) and len(entry) == 6 and entry[0] == DYNAMIC_CACHE_VERSION):
+        return None
+    _, inventory_key, cached_inputs_key, expires_at, message, listing = entry
+    if (inventory_key != _file_key(inventory_file) or cached_inputs_key != inputs_key(source)
+            or time.time() >= expires_at):
+        return None
+    return message, listing, hosts_path
+
+
+def build_response(inventory_file, source, sections=BLOCKING_SECTIONS, strict=False):
+    """Validate, convert and cache the inventory; returns what :func:`load_response` would."""
+    inventory_key = _file_key(inventory_file)
+    cached_inputs_key = inputs_key(source)
+    session = ValidationSession(inventory_file, source, inventory_cache=True, inventory_parser='full')
+    findings, _ = validate_incremental(session)
+    efs = session.efs
+    blocking = blocking_findings(findings, sections) if strict else []
+    message = refusal(blocking) if blocking else None
+    listing = None
+    hostvars = {}
+    if message is None:
+        groups, hostvars = ansible_inventory(session.inventory.data, efs.servers)
+        listing = _encode({**groups, '_meta': {'hostvars': hostvars}})
+    if source.cacheable:
+        expires_at = efs.fetched_at + source.ttl
+    elif source.efs_file or source.fixture:
+        expires_at = float('inf')  # Until the file changes
+    else:
+        expires_at = 0.0  # A live query that is not cached is made every time
+
+    list_path, hosts_path = _cache_paths(inventory_file, source, sections, strict)
+    save_pickle(hosts_path, {host: _encode(host_vars) for host, host_vars in hostvars.items()})
+    if expires_at > time.time():
+        save_pickle(list_path, (DYNAMIC_CACHE_VERSION, inventory_key, cached_inputs_key, expires_at, message, listing))
+    return message, listing, hosts_path
+
+
+def main(argv=None, inventory_file='inventory.prod.yaml'):
+    parser = argparse.ArgumentParser(description="Ansible dynamic inventory served from the validated inventory.")
+    query = parser.add_mutually_exclusive_group(required=True)
+    query.add_argument('--list', action='store_true', help="print every group and host as JSON")
+    query.add_argument('--host', metavar='HOST', help="print the vars of one host as JSON")
+    parser.add_argument('--inventory', default=os.environ.get(INVENTORY_ENV, inventory_file),
+                        help=f"Ansible inventory YAML to serve (default: ${INVENTORY_ENV} or %(default)s)")
+    add_efs_arguments(parser)
+    parser.add_argument('--strict', action='store_true', default=os.environ.get(STRICT_ENV, '') not in ('', '0'),
+                        help=f"serve nothing while validation has blocking findings (default: ${STRICT_ENV})")
+    parser.add_argument('--block-on', metavar='SECTION', action='append',
+                        choices=[attribute for attribute, _, _ in SECTIONS],
+                        help="finding section that blocks --strict, repeatable "
+                             f"(default: {', '.join(BLOCKING_SECTIONS)})")
+    args = parser.parse_args(argv)
+
+    source = efs_source_from_args(args)
+    sections = tuple(args.block_on or BLOCKING_SECTIONS)
+    response = load_response(args.inventory, source, sections, args.strict)
+    if response is None:
+        response = build_response(args.inventory, source, sections, args.strict)
+    message, listing, hosts_path = response
+    if message is not None:
+        print(message, file=sys.stderr)
+        return 1
+    if args.list:
+        sys.stdout.buffer.write(listing + b"\n")
+    else:
+        sys.stdout.buffer.write((load_pickle(hosts_path) or {}).get(args.host, b"{}") + b"\n")
+    sys.stdout.flush()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
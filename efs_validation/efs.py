@@ -0,0 +1,194 @@
+import subprocess
+import sys
+import time
+from collections import namedtuple
+from functools import cached_property
+
+from efs_validation.cache import cache_path, file_lock, load_pickle, save_pickle
+
+# Command that lists every server/cell pair known to the EFS database
+EFS_COMMAND = ('efs', 'display', 'efsservers')
+
+# How long a live EFS query result is shared between runs; override with EFS_VALIDATION_EFS_TTL or --efs-ttl
+EFS_TTL_ENV = 'EFS_VALIDATION_EFS_TTL'
+DEFAULT_EFS_TTL = 300
+
+# One server,cell,host_type row, whether it came from EFS directly or from efsservers.txt
+EfsRecord = namedtuple('EfsRecord', 'server cell host_type')
+
+
+class EfsServer:
+    """Everything EFS reports for one server: all of its cells and its host type."""
+
+    __slots__ = ('cells', 'host_type')
+
+    def __init__(self, cell, host_type):
+        self.cells = {cell}
+        self.host_type = host_type
+
+
+def parse_efs_table(lines):
+    """ Stream EfsRecords from `efs display efsservers` table output
+
+    Everything up to and including the ===== line under the column headers is
+    skipped, then each row is read as whitespace separated cell, server and
+    host type columns.
+    """
+    lines = iter(lines)
+    for line in lines:
+        if line.startswith('='):
+            break
+    intern = sys.intern  # cell names and host types repeat on almost every line
+    for line in lines:
+        fields = line.split()
+        if len(fields) < 3:
+            continue  # Skip blank and malformed lines
+        yield EfsRecord(fields[1], intern(fields[0]), intern(fields[2]))
+
+
+def iter_efs_command_records(command=EFS_COMMAND):
+    """ Run the EFS command without a shell and parse its output straight from the pipe """
+    with subprocess.Popen(command, stdout=subprocess.PIPE, text=True) as process:
+        yield from parse_efs_table(process.stdout)
+    if process.returncode:
+        raise subprocess.CalledProcessError(process.returncode, command)
+
+
+def iter_efs_fixture_records(fixture_file):
+    """ Parse a recorded copy of `efs display efsservers` output """
+    with open(fixture_file, 'r') as file:
+        yield from parse_efs_table(file)
+
+
+def iter_efs_records(efs_file):
+    """ Stream EfsRecords from an efsservers.txt file, skipping malformed lines """
+    intern = sys.intern
+    with open(efs_file, 'r') as file:
+        for line in file:
+            parts = line.strip().split(',')
+            if len(parts) != 3:
+                continue  # Skip malformed lines
+            server_name, cell_name, host_type = parts
+            yield EfsRecord(server_name, intern(cell_name), intern(host_type))
+
+
+class EfsSource:
+    """Where EFS records are read from.
+
+    By default the live EFS command is run. ``fixture`` is a recorded copy of
+    its output and ``efs_file`` a server,cell,host_type efsservers.txt; both let
+    a run be reproduced offline.
+
+    Results of the live command are shared through the cache directory for
+    ``ttl`` seconds (0 disables this); ``refresh`` forces a new query.
+    """
+
+    def __init__(self, command=EFS_COMMAND, fixture=None, efs_file=None, ttl=0, refresh=False):
+        self.command = tuple(command)
+        self.fixture = fixture
+        self.efs_file = efs_file
+        self.ttl = ttl
+        self.refresh = refresh
+
+    @property
+    def cacheable(self):
+        """Only the live query is worth caching; files are read faster than a cache would be."""
+        return self.ttl > 0 and self.efs_file is None and self.fixture is None
+
+    def records(self):
+        if self.efs_file is not None:
+            return iter_efs_records(self.efs_file)
+        if self.fixture is not None:
+            return iter_efs_fixture_records(self.fixture)
+        return iter_efs_command_records(self.command)
+
+    def __str__(self):
+        if self.efs_file is not None:
+            return self.efs_file
+        if self.fixture is not None:
+            return self.fixture
+        return ' '.join(self.command)
+
+
+def load_efs_servers(records):
+    """ Fold EFS records into server -> EfsServer in a single pass """
+    servers = {}
+    for server_name, cell_name, host_type in records:
+        server = servers.get(server_name)
+        if server is None:
+            servers[server_name] = EfsServer(cell_name, host_type)
+        else:
+            server.cells.add(cell_name)
+            server.host_type = host_type
+    return servers
+
+
+# Bump whenever EfsServer or the cached layout changes
+EFS_CACHE_VERSION = 1
+
+
+def load_cached_efs_servers(source):
+    """(servers, fetched_at, from_cache) for ``source``, reusing a result younger than its TTL.
+
+    The cache entry is locked while it is checked and refreshed, so runs that
+    start together wait for one EFS query and then share its result.
+    """
+    path = cache_path('efs', str(source))
+    with file_lock(path + '.lock'):
+        if not source.refresh:
+            cached = load_pickle(path)
+            if (isinstance(cached, tuple) and len(cached) == 4 and cached[0] == EFS_CACHE_VERSION
+                    and cached[1] == str(source) and 0 <= time.time() - cached[2] <= source.ttl):
+                return cached[3], cached[2], True
+        fetched_at = time.time()
+        servers = load_efs_servers(source.records())
+        save_pickle(path, (EFS_CACHE_VERSION, str(source), fetched_at, servers))
+    return servers, fetched_at, False
+
+
+class EfsSnapshot:
+    """EFS server data, read from its source the first time it is needed.
+
+    ``fetched_at`` is when that data was read from EFS, which for a cached
+    result is earlier than this run.
+    """
+
+    def __init__(self, source=None):
+        self.source = source if source is not None else EfsSource()
+        self.fetched_at = None
+        self.from_cache = False
+
+    @classmethod
+    def from_servers(cls, source, servers, fetched_at=None, from_cache=False):
+        """A snapshot of servers that were already loaded, e.g. in another process."""
+        snapshot = cls(source)
+        snapshot.servers = servers
+        snapshot.fetched_at = fetched_at
+        snapshot.from_cache = from_cache
+        return snapshot
+
+    @cached_property
+    def servers(self):
+        """server -> EfsServer, built from one streaming read of the source or its cached result."""
+        if self.source.cacheable:
+            servers, self.fetched_at, self.from_cache = load_cached_efs_servers(self.source)
+            return servers
+        self.fetched_at = time.time()
+        return load_efs_servers(self.source.records())
+
+    @cached_property
+    def signatures(self):
+        """server -> (frozenset of cells, host type), what incremental validation compares between runs."""
+        return {name: (frozenset(server.cells), server.host_type) for name, server in self.servers.items()}
+
+    @property
+    def age_seconds(self):
+        return None if self.fetched_at is None else max(time.time() - self.fetched_at, 0.0)
+
+    def describe(self):
+        """One line saying where the EFS data came from and how old it is."""
+        if self.fetched_at is None:
+            return f"EFS data: {self.source} (not read yet)"
+        fetched = time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(self.fetched_at))
+        cached = ", cached" if self.from_cache else ""
+        return f"EFS data: {self.source}, fetched {fetched} ({self.age_seconds:.0f}s old{cached})"
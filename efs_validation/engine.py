@@ -0,0 +1,108 @@
+"""Every check of a full validation in one pass over EFS and one over the inventory.
+
+The separate checks in :mod:`efs_validation.checks` each walk all EFS
+servers; :func:`validate_fused` visits each server once and emits every
+finding category as it goes, in the same order the separate checks report
+them. The checks module is still used to re-check subsets incrementally.
+
+Pass ``emit`` to have each finding handed over the moment it is found, e.g. to
+stream it to a JSONL or CSV file while the rest of the fleet is still checked.
+With ``fleet_table=True`` the missing, extra and cell mismatch findings come
+from a :class:`~efs_validation.fleet.FleetTable` diff instead, if numpy is
+installed, and are handed over together once it is done.
+"""
+
+from efs_validation.cellindex import SLOTS, CellIndex
+from efs_validation.findings import (CellMismatch, ExtraServer, Findings, MissingServer, ServertypeMismatch,
+                                     UnassignedServers)
+from efs_validation.fleet import HAVE_NUMPY, FleetTable
+from efs_validation.groups import UNKNOWN_GROUP, determine_group_from_pattern
+
+
+def _collect(findings, emit):
+    """An append for ``findings`` that also passes each finding to ``emit``, if given."""
+    if emit is None:
+        return findings.append
+
+    def append(finding):
+        findings.append(finding)
+        emit(finding)
+    return append
+
+
+def validate_fused(efs_servers, index, emit=None, resolve_group=determine_group_from_pattern, fleet_table=False):
+    """Run every check against an :class:`~efs_validation.inventory.InventoryIndex` and return the Findings.
+
+    ``emit``, if given, is called with every finding as soon as it is found.
+    ``resolve_group`` suggests the group of a missing server. ``fleet_table``
+    diffs EFS against the inventory with numpy arrays when numpy is installed.
+    """
+    table_diff = None
+    if fleet_table and HAVE_NUMPY:
+        table_diff = FleetTable.from_servers(efs_servers, index).compare(resolve_group)
+    host_cells = index.host_cells
+    host_group = index.host_group
+    servertype_dev = index.members('servertype_dev')
+    servertype_prod = index.members('servertype_prod')
+    controlgroup_a = index.members('controlgroup_a')
+    controlgroup_b = index.members('controlgroup_b')
+
+    missing_servers = []
+    cell_mismatches = []
+    servertype_mismatches = []
+    unassigned_servers = []
+    cell_index = CellIndex()
+    add_missing = _collect(missing_servers, emit)
+    add_cell_mismatch = _collect(cell_mismatches, emit)
+    add_servertype_mismatch = _collect(servertype_mismatches, emit)
+
+    for server_name, server in efs_servers.items():
+        if table_diff is None:
+            inventory_cells = host_cells.get(server_name)
+            if inventory_cells is None:
+                add_missing(MissingServer(server_name, resolve_group(server_name)))
+            elif server.cells != inventory_cells:
+                add_cell_mismatch(CellMismatch(server_name, host_group.get(server_name, UNKNOWN_GROUP),
+                                               frozenset(server.cells), inventory_cells))
+
+        host_type = server.host_type
+        if server_name in servertype_dev and host_type != 'dev':
+            add_servertype_mismatch(ServertypeMismatch(server_name, host_type, 'servertype_dev', 'servertype_prod'))
+        elif server_name in servertype_prod and host_type != 'prod':
+            add_servertype_mismatch(ServertypeMismatch(server_name, host_type, 'servertype_prod', 'servertype_dev'))
+
+        if server_name in controlgroup_a:
+            slot = SLOTS.get(('controlgroup_a', host_type))
+        elif server_name in controlgroup_b:
+            slot = SLOTS.get(('controlgroup_b', host_type))
+        else:
+            unassigned_servers.append(server_name)
+            continue
+        if slot is not None:  # Other host types take no part in the dev/prod pairing
+            cell_index.add(server_name, server.cells, slot)
+
+    extra_servers = []
+    add_extra = _collect(extra_servers, emit)
+    if table_diff is None:
+        for host in host_cells:
+            if host not in efs_servers:
+                add_extra(ExtraServer(host, host_group.get(host, UNKNOWN_GROUP)))
+    else:
+        for findings, add in zip(table_diff, (add_missing, add_extra, add_cell_mismatch)):
+            for finding in findings:
+                add(finding)
+
+    controlgroup_mismatches = cell_index.imbalances()
+    if unassigned_servers:
+        controlgroup_mismatches.append(UnassignedServers(len(efs_servers), tuple(unassigned_servers)))
+    if emit is not None:
+        for finding in controlgroup_mismatches:
+            emit(finding)
+
+    return Findings(
+        missing_servers=missing_servers,
+        extra_servers=extra_servers,
+        cell_mismatches=cell_mismatches,
+        servertype_mismatches=servertype_mismatches,
+        controlgroup_mismatches=controlgroup_mismatches,
+    )
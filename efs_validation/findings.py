@@ -0,0 +1,187 @@
+from dataclasses import dataclass, field, fields
+
+
+@dataclass(frozen=True)
+class MissingServer:
+    """A server EFS knows about that is not in the inventory."""
+
+    server: str
+    suggested_group: str
+
+    category = 'missing_server'
+
+    def lines(self):
+        return [f"{self.server} (New server, should be under group: {self.suggested_group})"]
+
+    def record(self):
+        return {'host': self.server, 'expected_group': self.suggested_group}
+
+
+@dataclass(frozen=True)
+class ExtraServer:
+    """A server in the inventory that EFS does not know about."""
+
+    server: str
+    group: str
+
+    category = 'extra_server'
+
+    def lines(self):
+        return [f"{self.server} (Group: {self.group})"]
+
+    def record(self):
+        return {'host': self.server, 'group': self.group}
+
+
+@dataclass(frozen=True)
+class CellMismatch:
+    """A server whose inventory cells differ from the cells EFS reports."""
+
+    server: str
+    group: str
+    expected_cells: frozenset
+    actual_cells: frozenset
+
+    category = 'cell_mismatch'
+
+    @property
+    def missing_cells(self):
+        return self.expected_cells - self.actual_cells
+
+    @property
+    def extra_cells(self):
+        return self.actual_cells - self.expected_cells
+
+    def lines(self):
+        lines = [
+            f"Server: {self.server} (Group: {self.group})",
+            f"  EFS Database Cells: {', '.join(sorted(self.expected_cells))}",
+            f"  AX Inventory Cells: {', '.join(sorted(self.actual_cells))}",
+        ]
+        if self.missing_cells:
+            lines.append(f"  Missing Cells: {', '.join(sorted(self.missing_cells))}")
+        if self.extra_cells:
+            lines.append(f"  Extra Cells: {', '.join(sorted(self.extra_cells))}")
+        return lines
+
+    def record(self):
+        return {'host': self.server, 'group': self.group, 'expected_cells': sorted(self.expected_cells),
+                'actual_cells': sorted(self.actual_cells)}
+
+
+@dataclass(frozen=True)
+class ServertypeMismatch:
+    """A server listed under the servertype group that contradicts its EFS host type."""
+
+    server: str
+    host_type: str
+    found_group: str
+    expected_group: str
+
+    category = 'servertype_mismatch'
+
+    def lines(self):
+        return [f"Mismatch: {self.server} {self.host_type} in {self.found_group} but it should be in {self.expected_group}"]
+
+    def record(self):
+        return {'host': self.server, 'group': self.found_group, 'expected_group': self.expected_group,
+                'host_type': self.host_type}
+
+
+@dataclass(frozen=True)
+class ControlGroupImbalance:
+    """A data center whose dev and prod servers are not paired within a control group."""
+
+    cell: str
+    controlgroup_a_dev: tuple
+    controlgroup_a_prod: tuple
+    controlgroup_b_dev: tuple
+    controlgroup_b_prod: tuple
+
+    category = 'controlgroup_imbalance'
+
+    def lines(self):
+        return [
+            f"Mismatch in data center {self.cell}:",
+            f"controlgroup_a: {' '.join(f'{s} (dev)' for s in self.controlgroup_a_dev)} {' '.join(f'{s} (prod)' for s in self.controlgroup_a_prod)}",
+            f"controlgroup_b: {' '.join(f'{s} (dev)' for s in self.controlgroup_b_dev)} {' '.join(f'{s} (prod)' for s in self.controlgroup_b_prod)}",
+        ]
+
+    def record(self):
+        return {'cell': self.cell, 'hosts': list(self.controlgroup_a_dev + self.controlgroup_a_prod
+                                                 + self.controlgroup_b_dev + self.controlgroup_b_prod)}
+
+
+@dataclass(frozen=True)
+class UnassignedServers:
+    """EFS servers that are in neither controlgroup_a nor controlgroup_b."""
+
+    total_servers: int
+    servers: tuple
+
+    category = 'unassigned_servers'
+
+    def lines(self):
+        return [
+            f"Total server count mismatch: expected {self.total_servers}, but assigned {self.total_servers - len(self.servers)}",
+            f"Unassigned servers: {' '.join(self.servers)}",
+        ]
+
+    def record(self):
+        return {'hosts': list(self.servers)}
+
+
+# (attribute, title, message when the section has no findings), in report order
+SECTIONS = (
+    ('missing_servers', "Missing servers in inventory (yaml):", "All EFS servers are present in the inventory."),
+    ('extra_servers', "Extra servers in inventory:", "No extra servers found in the inventory."),
+    ('cell_mismatches', "Cell Names validation:", "All cell names match."),
+    ('servertype_mismatches', "Servers group validation:", "All servers are in the correct groups."),
+    ('controlgroup_mismatches', "Control Group Validation:", "Controlgroup A and B are correctly balanced for high availability."),
+)
+
+
+@dataclass
+class Findings:
+    """Everything one validation run found, grouped by check."""
+
+    missing_servers: list = field(default_factory=list)
+    extra_servers: list = field(default_factory=list)
+    cell_mismatches: list = field(default_factory=list)
+    servertype_mismatches: list = field(default_factory=list)
+    controlgroup_mismatches: list = field(default_factory=list)
+
+    def sections(self):
+        """Yield (title, findings, ok_message) for every check, in report order."""
+        for attribute, title, ok_message in SECTIONS:
+            yield title, getattr(self, attribute), ok_message
+
+    def __len__(self):
+        return sum(len(getattr(self, attribute)) for attribute, _, _ in SECTIONS)
+
+
+# Columns of the flat per-finding records; a finding leaves the ones it has no value for empty
+RECORD_FIELDS = ('category', 'host', 'group', 'expected_group', 'host_type', 'expected_cells', 'actual_cells',
+                 'cell', 'hosts', 'message')
+
+
+def flat_record(finding):
+    """A finding as a dict with every RECORD_FIELDS key, for the JSONL and CSV outputs."""
+    record = dict.fromkeys(RECORD_FIELDS)
+    record['category'] = finding.category
+    record.update(finding.record())
+    record['message'] = "\n".join(finding.lines())
+    return record
+
+
+def finding_record(finding):
+    """A finding as a JSON-ready dict: its kind, then its fields with sets sorted into lists."""
+    record = {'kind': type(finding).__name__}
+    for attribute in fields(finding):
+        value = getattr(finding, attribute.name)
+        if isinstance(value, frozenset):
+            value = sorted(value)
+        elif isinstance(value, tuple):
+            value = list(value)
+        record[attribute.name] = value
+    return record
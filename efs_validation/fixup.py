@@ -0,0 +1,383 @@
+"""Fix missing servers and cell drift in the inventory with small text edits.
+
+    python -m efs_validation.fixup --inventory inventory.prod.yaml [--apply] [--output fixes.diff]
+
+Missing servers are added, with their EFS cells, under the group their name
+maps to (see :func:`~efs_validation.groups.group_resolver`), and the
+``cells`` of every server whose cells differ from EFS are made to match.
+Nothing else is touched: the file is not dumped again, so comments, key
+order, quoting and layout stay as they are, and cells that are right keep
+their lines. Where each edit goes comes from the line and column marks of the
+YAML events, so a large inventory is fixed in seconds.
+
+The edits are printed as a unified diff (for review, or ``git apply``), or
+written back to the file with ``--apply``. Anything that cannot be edited in
+place, e.g. a server whose group is not known, is listed for fixing by hand.
+"""
+
+import argparse
+import os
+import re
+import shutil
+import sys
+
+import yaml
+from yaml.nodes import ScalarNode
+from yaml.resolver import Resolver
+
+from efs_validation.cli import (add_efs_arguments, add_inventory_arguments, add_profile_arguments,
+                                efs_source_from_args, profile_from_args)
+from efs_validation.groups import UNKNOWN_GROUP
+from efs_validation.inventory import MEMBERSHIP_GROUPS, SafeLoader
+from efs_validation.session import ValidationSession
+from efs_validation.yamlstream import STR_TAG, FullLoadNeeded, locate_from_events
+
+# Lines of context around each change in the diff
+CONTEXT_LINES = 3
+
+_PLAIN = re.compile(r"[A-Za-z0-9_][A-Za-z0-9_.-]*")
+_resolve = Resolver().resolve
+
+
+def _scalar(value):
+    """``value`` as a YAML scalar that loads back as the same str."""
+    if _PLAIN.fullmatch(value) and _resolve(ScalarNode, value, (True, False)) == STR_TAG:
+        return value
+    return "'" + value.replace("'", "''") + "'"
+
+
+class InventoryEdits:
+    """Line edits to an inventory's text: lines deleted or replaced, and lines inserted after others.
+
+    Several insertions after the same line are kept in the order they were made.
+    """
+
+    def __init__(self, lines, layout):
+        self.lines = lines
+        self.layout = layout
+        self.eol = '\r\n' if lines and lines[0].endswith('\r\n') else '\n'
+        self.deleted = set()
+        self.replaced = {}  # line -> new text
+        self.inserted = {}  # line -> new lines after it
+        self.manual = []    # what has to be fixed by hand, and why
+
+    def __bool__(self):
+        return bool(self.deleted or self.replaced or self.inserted)
+
+    def delete(self, line):
+        self.deleted.add(line)
+
+    def replace(self, line, text):
+        self.replaced[line] = text + self.eol
+
+    def insert_after(self, line, texts):
+        self.inserted.setdefault(line, []).extend(text + self.eol for text in texts)
+
+    def changes(self):
+        """The edits as sorted ``(start, end, new_lines)``: ``lines[start:end]`` becomes ``new_lines``."""
+        lines = self.lines
+        changes = []
+        for line in sorted(self.deleted | self.replaced.keys() | self.inserted.keys()):
+            removed = line in self.deleted or line in self.replaced
+            new = [self.replaced[line]] if line in self.replaced else []
+            after = self.inserted.get(line, [])
+            if after and not removed and not lines[line].endswith('\n'):
+                removed, new = True, [lines[line] + self.eol]  # Inserting after the unterminated last line
+            new += after
+            start = line if removed else line + 1
+            changes.append((start, line + 1 if removed else start, new))
+        return changes
+
+    def apply(self):
+        """The edited lines."""
+        lines = self.lines
+        edited = []
+        position = 0
+        for start, end, new in self.changes():
+            edited += lines[position:start]
+            edited += new
+            position = end
+        edited += lines[position:]
+        return edited
+
+
+def read_lines(inventory_file):
+    """The lines of ``inventory_file``, each with its line break, as the YAML parser counts them."""
+    with open(inventory_file, newline='') as file:
+        text = file.read()
+    lines = [line + '\n' for line in text.split('\n')]
+    if text.endswith('\n') or not text:
+        lines.pop()
+    else:
+        lines[-1] = lines[-1][:-1]
+    return text, lines
+
+
+def _walk_groups(name, group, groups, listings):
+    """Collect every Located group by name and every listing of a host as (group, Located host)."""
+    groups.setdefault(name, []).append(group)
+    hosts = group.children.get('hosts')
+    if hosts is not None:
+        for host, located in hosts.children.items():
+            listings.setdefault(host, []).append((name, located))
+    children = group.children.get('children')
+    if children is not None:
+        for child, located in children.children.items():
+            _walk_groups(child, located, groups, listings)
+
+
+class _Layout:
+    """The indentation the file already uses, to write new keys and cells the same way."""
+
+    def __init__(self, groups):
+        self.step = 2          # extra indent of a mapping's keys under its parent key
+        self.cells_offset = 0  # extra indent of a cells '- ' under the cells key
+        for located_groups in groups.values():
+            for group in located_groups:
+                hosts = group.children.get('hosts')
+                for host in (hosts.children.values() if hosts is not None else ()):
+                    cells = host.children.get('cells')
+                    if cells is not None and cells.style == 'block':
+                        self.step = host.indent - host.key_column
+                        self.cells_offset = cells.start[1] - cells.key_column
+                        return
+
+    def cells(self, indent, cells):
+        """Lines of a ``cells`` key at ``indent`` and its block list."""
+        prefix = ' ' * (indent + self.cells_offset) + '- '
+        return [' ' * indent + 'cells:'] + [prefix + _scalar(cell) for cell in sorted(cells)]
+
+    def host(self, indent, host, cells):
+        return [' ' * indent + _scalar(host) + ':'] + self.cells(indent + self.step, cells)
+
+
+def _append_to(edits, located, texts_at, what):
+    """Add keys to the block mapping ``located``, or turn its empty or null value into a block mapping.
+
+    ``texts_at(indent)`` gives the new lines with their keys at ``indent``. A
+    value that cannot be edited in place is noted as ``what`` to fix by hand.
+    """
+    lines = edits.lines
+    if located.style == 'block':
+        edits.insert_after(located.last_line, texts_at(located.indent))
+        return
+    line, column = located.start
+    empty = located.style == 'null' or (located.style == 'flow' and located.end[0] == line
+                                        and lines[line][column:located.end[1]].replace(' ', '') == '{}')
+    if not empty or line != located.key_line:
+        edits.manual.append(f"{what}: its value is not a block mapping")
+        return
+    rest = lines[line][located.end[1]:].strip()
+    text = lines[line][:column].rstrip()
+    text = text + ' ' + rest if rest.startswith('#') else text
+    if text != lines[line].rstrip('\r\n'):
+        edits.replace(line, text)
+    edits.insert_after(line, texts_at(located.key_column + edits.layout.step))
+
+
+def _reconcile_cells(edits, host, located, expected):
+    """Edit one ``cells`` list of ``host`` so that it holds exactly ``expected``."""
+    lines = edits.lines
+    kept = []
+    removed = []
+    for item in located.items:
+        if item[4].strip() in expected and item[4].strip() not in kept:
+            kept.append(item[4].strip())
+        else:
+            removed.append(item)
+    added = sorted(expected.difference(kept))
+    if not added and not removed:
+        return
+    if located.style == 'block':
+        first_line, first_column = located.items[0][:2]
+        for line, column, end_line, _, _ in removed:
+            if end_line != line or lines[line][:column].strip() != '-':
+                edits.manual.append(f"{host}: a cell item is not on a line of its own")
+                return
+        for line, _, _, _, _ in removed:
+            edits.delete(line)
+        prefix = lines[first_line][:first_column]
+        edits.insert_after(located.items[-1][2], [prefix + _scalar(cell) for cell in added])
+    elif (located.style == 'flow' and located.start[0] == located.end[0]) or located.style == 'null':
+        line, column = located.start
+        if located.style == 'null' and located.start == located.end:  # `cells:` with nothing after it
+            edits.insert_after(line, edits.layout.cells(located.key_column, expected)[1:])
+            return
+        cells = ', '.join(_scalar(cell) for cell in kept + added)
+        text = lines[line]
+        edits.replace(line, (text[:column] + f"[{cells}]" + text[located.end[1]:]).rstrip('\r\n'))
+    else:
+        edits.manual.append(f"{host}: its cells are not a list that can be edited in place")
+
+
+def fix_cells(edits, listings, mismatch):
+    """Make the cells of ``mismatch.server`` the EFS ones in every listing that declares cells."""
+    host = mismatch.server
+    expected = set(mismatch.expected_cells)
+    declaring = [located.children['cells'] for _, located in listings.get(host, ()) if 'cells' in located.children]
+    for located in declaring:
+        _reconcile_cells(edits, host, located, expected)
+    if declaring:
+        return
+    if mismatch.group in MEMBERSHIP_GROUPS:
+        edits.manual.append(f"{host}: declares no cells and is only placed in {mismatch.group}")
+        return
+    for group, located in listings.get(host, ()):
+        if group == mismatch.group:
+            _append_to(edits, located, lambda indent: edits.layout.cells(indent, expected), host)
+            return
+
+
+def add_missing(edits, groups, group, servers):
+    """Add ``servers`` ({name: EFS cells}) to the hosts of ``group``, or add the group under ``all``."""
+    layout = edits.layout
+
+    def hosts_at(indent):
+        return [line for server in sorted(servers) for line in layout.host(indent, server, servers[server])]
+
+    if group == UNKNOWN_GROUP:
+        edits.manual.extend(f"{server}: no group matches its name" for server in sorted(servers))
+        return
+    located_groups = groups.get(group)
+    if not located_groups:
+        children = groups['all'][0].children.get('children')
+        if children is None:
+            edits.manual.extend(f"{server}: the inventory has no group {group}, and 'all' no children to add it to"
+                                for server in sorted(servers))
+            return
+        _append_to(edits, children, lambda indent: [' ' * indent + _scalar(group) + ':',
+                                                    ' ' * (indent + layout.step) + 'hosts:']
+                   + hosts_at(indent + 2 * layout.step), f"{group} (for {', '.join(sorted(servers))})")
+        return
+    located = located_groups[-1]  # Where the group is listed last, as Ansible merges its hosts
+    hosts = located.children.get('hosts')
+    if hosts is not None:
+        _append_to(edits, hosts, hosts_at, f"{group} hosts (for {', '.join(sorted(servers))})")
+    else:
+        _append_to(edits, located, lambda indent: [' ' * indent + 'hosts:'] + hosts_at(indent + layout.step),
+                   f"{group} (for {', '.join(sorted(servers))})")
+
+
+def plan_fixes(lines, located_all, findings, efs_servers):
+    """The InventoryEdits adding the missing servers and reconciling the cell mismatches in ``findings``."""
+    groups = {}
+    listings = {}
+    if located_all is not None:
+        _walk_groups('all', located_all, groups, listings)
+    edits = InventoryEdits(lines, _Layout(groups))
+    for mismatch in findings.cell_mismatches:
+        fix_cells(edits, listings, mismatch)
+    missing = {}
+    for finding in findings.missing_servers:
+        missing.setdefault(finding.suggested_group, {})[finding.server] = efs_servers[finding.server].cells
+    # Groups that are added go after the hosts added to existing ones, which may end where they start
+    for group, servers in sorted(missing.items(), key=lambda item: item[0] not in groups):
+        if located_all is None:
+            edits.manual.extend(f"{server}: the inventory has no 'all' group" for server in sorted(servers))
+        else:
+            add_missing(edits, groups, group, servers)
+    return edits
+
+
+def _diff_line(prefix, line):
+    if line.endswith('\n'):
+        return prefix + line
+    return prefix + line + "\n\\ No newline at end of file\n"
+
+
+def unified_diff(edits, path, context=CONTEXT_LINES):
+    """The edits as a ``git apply``-able unified diff of ``path``, built from the edits without comparing the files."""
+    lines = edits.lines
+    hunks = []
+    changes = edits.changes()
+    if not changes:
+        return ''
+    for change in changes:
+        if hunks and change[0] - hunks[-1][-1][1] <= 2 * context:
+            hunks[-1].append(change)
+        else:
+            hunks.append([change])
+    out = [f"--- a/{path}\n", f"+++ b/{path}\n"]
+    offset = 0
+    for hunk in hunks:
+        old_start = max(hunk[0][0] - context, 0)
+        old_end = min(hunk[-1][1] + context, len(lines))
+        body = []
+        position = old_start
+        growth = 0
+        for start, end, new in hunk:
+            body += [_diff_line(' ', line) for line in lines[position:start]]
+            body += [_diff_line('-', line) for line in lines[start:end]]
+            body += [_diff_line('+', line) for line in new]
+            growth += len(new) - (end - start)
+            position = end
+        body += [_diff_line(' ', line) for line in lines[position:old_end]]
+        old_count = old_end - old_start
+        new_count = old_count + growth
+        new_start = old_start + offset
+        out.append(f"@@ -{old_start + (1 if old_count else 0)},{old_count} "
+                   f"+{new_start + (1 if new_count else 0)},{new_count} @@\n")
+        out += body
+        offset += growth
+    return ''.join(out)
+
+
+def write_lines(path, lines):
+    """Replace ``path`` with ``lines`` in one step, keeping its permissions."""
+    temp = path + '.fixup'
+    with open(temp, 'w', newline='') as file:
+        file.writelines(lines)
+    shutil.copymode(path, temp)
+    os.replace(temp, path)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Add missing servers and fix cell drift in the inventory.")
+    parser.add_argument('--inventory', default='inventory.prod.yaml',
+                        help="Ansible inventory to fix (default: %(default)s)")
+    add_efs_arguments(parser)
+    add_inventory_arguments(parser)
+    parser.add_argument('--apply', action='store_true', help="edit the inventory in place instead of printing a diff")
+    parser.add_argument('--output', metavar='FILE', help="write the diff here instead of stdout")
+    add_profile_arguments(parser)
+    args = parser.parse_args(argv)
+    profile = profile_from_args(args)
+
+    session = ValidationSession(args.inventory, efs_source_from_args(args), profile, args.inventory_cache,
+                                args.inventory_parser, group_map=args.group_map)
+    findings = session.validate()
+    with profile.stage('locate'):
+        text, lines = read_lines(args.inventory)
+        try:
+            located_all = locate_from_events(yaml.parse(text, Loader=SafeLoader))
+        except FullLoadNeeded as e:
+            raise SystemExit(f"Cannot edit {args.inventory} in place: {e}")
+    with profile.stage('plan'):
+        edits = plan_fixes(lines, located_all, findings, session.efs.servers)
+    with profile.stage('write'):
+        if args.apply:
+            if edits:
+                write_lines(args.inventory, edits.apply())
+        else:
+            diff = unified_diff(edits, os.path.relpath(args.inventory).replace(os.sep, '/'))
+            if args.output:
+                with open(args.output, 'w') as output:
+                    output.write(diff)
+            else:
+                sys.stdout.write(diff)
+    profile.count('missing_servers', len(findings.missing_servers))
+    profile.count('cell_mismatches', len(findings.cell_mismatches))
+
+    report = sys.stderr if not args.apply and not args.output else sys.stdout
+    print(f"{len(findings.missing_servers)} missing servers and {len(findings.cell_mismatches)} cell mismatches: "
+          f"{len(edits.changes())} edits{' applied' if args.apply and edits else ''}, "
+          f"{len(edits.manual)} left to fix by hand", file=report)
+    for item in edits.manual:
+        print(f"  {item}", file=report)
+    for line in profile.footer_lines():
+        print(line, file=report)
+    profile.write_json(args.profile_json)
+
+
+if __name__ == "__main__":
+    main()
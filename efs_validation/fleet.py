@@ -0,0 +1,147 @@
+"""Columnar, interned fleet table for the EFS/inventory diff.
+
+Host, cell, group and host type names are interned to integer codes once;
+(host, cell) membership on each side is a sorted array of ``host * cells +
+cell`` keys. Missing servers, extra servers and cell mismatches then fall out
+of numpy set operations on those arrays instead of per-host set comparisons.
+
+numpy is optional: :data:`HAVE_NUMPY` says whether :class:`FleetTable` can be
+used. The scripts use it for the full validation diff with ``--fleet-table``
+(see :func:`~efs_validation.engine.validate_fused`) and fall back to the dict
+based diff without numpy, which also stays the default.
+"""
+
+from array import array
+
+from efs_validation.findings import CellMismatch, ExtraServer, MissingServer
+from efs_validation.groups import UNKNOWN_GROUP, determine_group_from_pattern
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+HAVE_NUMPY = np is not None
+
+
+class _Codes:
+    """Names interned to dense integer codes in first-seen order."""
+
+    def __init__(self):
+        self.names = []
+        self.codes = {}
+
+    def code(self, name):
+        code = self.codes.get(name)
+        if code is None:
+            code = self.codes[name] = len(self.names)
+            self.names.append(name)
+        return code
+
+
+class FleetTable:
+    """EFS and inventory membership of every host as sorted integer arrays.
+
+    Host codes are handed out to EFS servers first, in EFS order, and then to
+    inventory-only hosts in inventory order, so sorting by host code keeps the
+    order the dict based checks report in.
+    """
+
+    def __init__(self, hosts, cells, groups, host_types, efs_host_count, efs_host_types,
+                 inventory_hosts, inventory_groups, efs_pairs, inventory_pairs):
+        self.hosts = hosts                        # _Codes of host names
+        self.cells = cells                        # _Codes of cell names
+        self.groups = groups                      # _Codes of inventory group names
+        self.host_types = host_types              # _Codes of EFS host types
+        self.efs_host_count = efs_host_count      # EFS servers have host codes 0 .. efs_host_count - 1
+        self.efs_host_types = efs_host_types      # host code -> host type code, for EFS servers
+        self.inventory_hosts = inventory_hosts    # sorted host codes in the inventory
+        self.inventory_groups = inventory_groups  # group code of each inventory host, aligned with inventory_hosts
+        self.efs_pairs = efs_pairs                # sorted unique host * len(cells) + cell keys from EFS
+        self.inventory_pairs = inventory_pairs    # the same from the inventory
+
+    @classmethod
+    def build(cls, efs_records, index):
+        """Intern a stream of EfsRecords and an InventoryIndex into a table."""
+        if np is None:
+            raise RuntimeError("FleetTable needs numpy")
+        hosts, cells, groups, host_types = _Codes(), _Codes(), _Codes(), _Codes()
+        host_code, cell_code = hosts.code, cells.code
+
+        efs_hosts = array('i')
+        efs_cells = array('i')
+        efs_host_types = array('b')
+        for server_name, cell_name, host_type in efs_records:
+            host = host_code(server_name)
+            if host == len(efs_host_types):
+                efs_host_types.append(host_types.code(host_type))
+            else:
+                efs_host_types[host] = host_types.code(host_type)  # the last row seen wins
+            efs_hosts.append(host)
+            efs_cells.append(cell_code(cell_name))
+        efs_host_count = len(hosts.names)
+
+        inventory_hosts = array('i')
+        inventory_groups = array('i')
+        pair_hosts = array('i')
+        pair_cells = array('i')
+        for host_name, host_cells in index.host_cells.items():
+            host = host_code(host_name)
+            inventory_hosts.append(host)
+            inventory_groups.append(groups.code(index.host_group.get(host_name, UNKNOWN_GROUP)))
+            for cell_name in host_cells:
+                pair_hosts.append(host)
+                pair_cells.append(cell_code(cell_name))
+
+        cell_count = max(len(cells.names), 1)
+
+        def pairs(host_codes, cell_codes):
+            keys = np.frombuffer(host_codes, dtype=np.int32).astype(np.int64) * cell_count
+            return np.unique(keys + np.frombuffer(cell_codes, dtype=np.int32))
+
+        inventory_hosts = np.frombuffer(inventory_hosts, dtype=np.int32)
+        order = np.argsort(inventory_hosts, kind='stable')
+        return cls(hosts, cells, groups, host_types, efs_host_count,
+                   np.frombuffer(efs_host_types, dtype=np.int8),
+                   inventory_hosts[order], np.frombuffer(inventory_groups, dtype=np.int32)[order],
+                   pairs(efs_hosts, efs_cells), pairs(pair_hosts, pair_cells))
+
+    @classmethod
+    def from_servers(cls, efs_servers, index):
+        """Intern the EfsServers of an EfsSnapshot and an InventoryIndex into a table."""
+        return cls.build(((server_name, cell_name, server.host_type)
+                          for server_name, server in efs_servers.items() for cell_name in server.cells), index)
+
+    def _cells_of(self, pairs, host):
+        cell_count = max(len(self.cells.names), 1)
+        start, end = np.searchsorted(pairs, (host * cell_count, (host + 1) * cell_count))
+        return frozenset(self.cells.names[key % cell_count] for key in pairs[start:end].tolist())
+
+    def _group_of(self, host):
+        position = np.searchsorted(self.inventory_hosts, host)
+        return self.groups.names[self.inventory_groups[position]]
+
+    def compare(self, resolve_group=determine_group_from_pattern):
+        """(missing servers, extra servers, cell mismatches), as compare_inventory_with_efs reports them."""
+        names = self.hosts.names
+        cell_count = max(len(self.cells.names), 1)
+        efs_hosts = np.arange(self.efs_host_count, dtype=np.int32)
+        in_inventory = np.isin(efs_hosts, self.inventory_hosts, assume_unique=True)
+
+        missing_servers = [MissingServer(names[host], resolve_group(names[host]))
+                           for host in efs_hosts[~in_inventory].tolist()]
+
+        # Inventory-only hosts were coded after every EFS server
+        extra_servers = [ExtraServer(names[host], self.groups.names[group])
+                         for host, group in zip(self.inventory_hosts.tolist(), self.inventory_groups.tolist())
+                         if host >= self.efs_host_count]
+
+        # A host in both whose (host, cell) keys appear on one side only has a cell mismatch
+        differing = np.unique(np.setxor1d(self.efs_pairs, self.inventory_pairs, assume_unique=True) // cell_count)
+        differing = differing[differing < self.efs_host_count]
+        differing = differing[in_inventory[differing]]
+        cell_mismatches = [CellMismatch(names[host], self._group_of(host), self._cells_of(self.efs_pairs, host),
+                                        self._cells_of(self.inventory_pairs, host))
+                           for host in differing.tolist()]
+
+        return missing_servers, extra_servers, cell_mismatches
@@ -0,0 +1,200 @@
+"""Validate only what an inventory change touches, for pull requests.
+
+    python -m efs_validation.gitdiff --inventory inventory.prod.yaml --base origin/main [--head HEAD]
+
+The inventory is read at both revisions (the working tree if --head is not
+given) and the two indexes are diffed for the hosts, groups and cells that
+changed. Only the changed hosts are checked against EFS, plus the control
+group balance of the data centers they are in, so the time taken follows the
+size of the change rather than of the fleet. The same checks are run against
+the base revision to tell which findings the change introduces: ones about a
+host or cell the base has no such finding for, or that got worse (more wrong
+cells, more unpaired servers). The exit status is 1 if there are any, so a
+change that only partly fixes a finding still passes.
+
+Indexes are cached by git blob id, so a revision that was read before is not
+parsed again.
+"""
+
+import argparse
+import os
+import subprocess
+import sys
+from dataclasses import dataclass
+
+from efs_validation.cache import cache_path, load_pickle, save_pickle
+from efs_validation.checks import check_unassigned_servers
+from efs_validation.cli import (add_efs_arguments, add_inventory_arguments, add_profile_arguments,
+                                efs_source_from_args, profile_from_args)
+from efs_validation.efs import EfsSnapshot
+from efs_validation.findings import SECTIONS, CellMismatch, ControlGroupImbalance, Findings, UnassignedServers
+from efs_validation.groups import group_resolver
+from efs_validation.incremental import changed_keys, check_hosts
+from efs_validation.inventory import (INVENTORY_CACHE_VERSION, MEMBERSHIP_GROUPS, InventorySnapshot,
+                                      build_inventory_index, decode_index, encode_index, parse_inventory_bytes)
+from efs_validation.render import write_text_report
+
+_NO_CELLS = frozenset()
+
+# How many changed group and cell names the report lists before summarizing the rest
+LISTED_NAMES = 20
+
+
+def _git(args, cwd, check=True):
+    return subprocess.run(['git', *args], cwd=cwd, capture_output=True, check=check)
+
+
+def git_blob(inventory_file, rev):
+    """The blob id of ``inventory_file`` at ``rev``, or None if the file does not exist there."""
+    directory, name = os.path.split(os.path.abspath(inventory_file))
+    if _git(['rev-parse', '--verify', '--quiet', f'{rev}^{{commit}}'], directory, check=False).returncode:
+        raise SystemExit(f"Unknown git revision: {rev}")
+    result = _git(['rev-parse', '--verify', '--quiet', f'{rev}:./{name}'], directory, check=False)
+    return result.stdout.decode().strip() or None
+
+
+def revision_index(inventory_file, rev, parser='stream'):
+    """The InventoryIndex of ``inventory_file`` at git revision ``rev``; empty if it did not exist yet."""
+    blob = git_blob(inventory_file, rev)
+    if blob is None:
+        return build_inventory_index(None)
+    path = cache_path('inventory-blob', blob)
+    cached = load_pickle(path)
+    if isinstance(cached, tuple) and len(cached) == 2 and cached[0] == INVENTORY_CACHE_VERSION:
+        return decode_index(cached[1])
+    data = _git(['cat-file', 'blob', blob], os.path.dirname(os.path.abspath(inventory_file))).stdout
+    index = build_inventory_index(parse_inventory_bytes(data, parser))
+    save_pickle(path, (INVENTORY_CACHE_VERSION, encode_index(index)))
+    return index
+
+
+@dataclass
+class InventoryChange:
+    """What differs between two versions of an inventory."""
+
+    hosts: list   # added, removed, or with other cells, placement or servertype/controlgroup memberships
+    groups: list  # groups whose hosts differ, including added and removed groups
+    cells: set    # inventory cells that some host gained or lost
+
+    def __str__(self):
+        return f"{len(self.hosts)} hosts, {len(self.groups)} groups and {len(self.cells)} cells changed"
+
+
+def diff_indexes(base, head):
+    """The :class:`InventoryChange` from one InventoryIndex to another."""
+    hosts = changed_keys(base.host_cells, head.host_cells) | changed_keys(base.host_group, head.host_group)
+    for group in MEMBERSHIP_GROUPS:
+        hosts |= base.members(group) ^ head.members(group)
+    groups = [group for group, members in head.group_hosts.items() if base.group_hosts.get(group) != members]
+    groups += [group for group in base.group_hosts if group not in head.group_hosts]
+    cells = set()
+    for host in hosts:
+        cells |= base.host_cells.get(host, _NO_CELLS) ^ head.host_cells.get(host, _NO_CELLS)
+    return InventoryChange(sorted(hosts), groups, cells)
+
+
+def validate_change(efs_servers, index, change, group_map=None):
+    """The findings of ``index`` (either version) for the changed hosts and the data centers they are in.
+
+    Servers in neither control group are counted over the whole fleet, and
+    reported only if one of the changed hosts is among them.
+    """
+    host_efs = {host: efs_servers[host] for host in change.hosts if host in efs_servers}
+    cells = set().union(*(server.cells for server in host_efs.values()))
+    resolver = group_resolver(index.group_prefixes, group_map)
+    findings = check_hosts(efs_servers, index, change.hosts, cells, resolver.resolve)
+    unassigned = check_unassigned_servers(efs_servers, index.members('controlgroup_a'), index.members('controlgroup_b'))
+    if unassigned and not host_efs.keys().isdisjoint(unassigned[0].servers):
+        findings.controlgroup_mismatches += unassigned
+    return findings
+
+
+def finding_key(finding):
+    """What a finding is about, whatever it says about it: its category and server, or its cell."""
+    if isinstance(finding, ControlGroupImbalance):
+        return finding.category, finding.cell
+    if isinstance(finding, UnassignedServers):
+        return (finding.category,)
+    return finding.category, finding.server
+
+
+def severity(finding):
+    """How bad a finding is, comparable between two findings with the same :func:`finding_key`."""
+    if isinstance(finding, CellMismatch):
+        return len(finding.expected_cells ^ finding.actual_cells)
+    if isinstance(finding, ControlGroupImbalance):
+        return (abs(len(finding.controlgroup_a_dev) - len(finding.controlgroup_a_prod))
+                + abs(len(finding.controlgroup_b_dev) - len(finding.controlgroup_b_prod)))
+    if isinstance(finding, UnassignedServers):
+        return len(finding.servers)
+    return 0
+
+
+def new_findings(base_findings, head_findings):
+    """The findings in ``head_findings`` that ``base_findings`` has no finding about, or a less severe one."""
+    new = {}
+    for attribute, _, _ in SECTIONS:
+        base = {finding_key(finding): severity(finding) for finding in getattr(base_findings, attribute)}
+        new[attribute] = [finding for finding in getattr(head_findings, attribute)
+                          if severity(finding) > base.get(finding_key(finding), -1)]
+    return Findings(**new)
+
+
+def _names(names):
+    names = sorted(names)
+    listed = ', '.join(names[:LISTED_NAMES])
+    return listed + (f" and {len(names) - LISTED_NAMES} more" if len(names) > LISTED_NAMES else '')
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Validate only the hosts an inventory change touches.")
+    parser.add_argument('--inventory', default='inventory.prod.yaml',
+                        help="Ansible inventory file in a git checkout (default: %(default)s)")
+    parser.add_argument('--base', required=True, metavar='REV', help="revision the change is based on")
+    parser.add_argument('--head', metavar='REV', help="revision with the change (default: the working tree)")
+    add_efs_arguments(parser)
+    add_inventory_arguments(parser)
+    parser.add_argument('--output', metavar='FILE', help="write the report here instead of stdout")
+    add_profile_arguments(parser)
+    args = parser.parse_args(argv)
+    profile = profile_from_args(args)
+
+    with profile.stage('base_index'):
+        base = revision_index(args.inventory, args.base, args.inventory_parser)
+    with profile.stage('head_index'):
+        if args.head is None:
+            head = InventorySnapshot(args.inventory, args.inventory_cache, args.inventory_parser).index
+        else:
+            head = revision_index(args.inventory, args.head, args.inventory_parser)
+    with profile.stage('diff'):
+        change = diff_indexes(base, head)
+    efs = EfsSnapshot(efs_source_from_args(args))
+    with profile.stage('efs_query'):
+        efs_servers = efs.servers
+    with profile.stage('checks'):
+        head_findings = validate_change(efs_servers, head, change, args.group_map)
+        base_findings = validate_change(efs_servers, base, change, args.group_map)
+        introduced = new_findings(base_findings, head_findings)
+        resolved = new_findings(head_findings, base_findings)
+    profile.count('changed_hosts', len(change.hosts))
+    profile.count('introduced_findings', len(introduced))
+
+    notes = [efs.describe(),
+             f"Changes to {args.inventory} from {args.base} to {args.head or 'the working tree'}: {change}"]
+    if change.groups:
+        notes.append(f"Groups changed: {_names(change.groups)}")
+    if change.cells:
+        notes.append(f"Cells changed: {_names(change.cells)}")
+    notes.append(f"Findings for the changed hosts: {len(introduced)} introduced by this change, "
+                 f"{len(resolved)} resolved, {len(head_findings) - len(introduced)} already there")
+    if args.output:
+        with open(args.output, 'w') as output:
+            write_text_report(head_findings, output, profile, notes)
+    else:
+        write_text_report(head_findings, sys.stdout, profile, notes)
+    profile.write_json(args.profile_json)
+    return 1 if len(introduced) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
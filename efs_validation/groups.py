@@ -0,0 +1,151 @@
+import os
+import re
+from collections import Counter
+from functools import lru_cache
+
+import yaml
+
+# Define the pattern-to-group mapping
+PATTERN_TO_GROUP = {
+    r"lauau2pefs.*": "l_aja_ausy01sr1",
+    r"lauau1cefs.*": "l_aja_ausy02sr1",
+    r"lcnhk01efs.*": "l_aja_cnhk01",
+    r"lcnhk02efs.*": "l_aja_cnhk02",
+    r"linch07efs.*": "l_aja_inch07sr1",
+    r"linin0cefs.*": "l_aja_inmu02sr1",
+    r"linin8pefs.*": "l_aja_inmu01sr1",
+    r"linmu08efs.*": "l_aja_inmu08sr1",
+    r"ljpsa01efs.*": "l_aja_jpsa01",
+    r"ljpnz01efs.*": "l_aja_jpnz01",
+    r"ljptk01efs.*": "l_aja_jptk01",
+    r"lkrkr0pefs.*": "l_aja_kray01sr1",
+    r"lkrkr0cefs.*": "l_aja_krse01sr2",
+    r"lsgsg01efs.*": "l_aja_sgsg01",
+    r"lsgsg02efs.*": "l_aja_sgsg02",
+    r"ltwtp04efs.*": "l_aja_twtp04",
+    r"ltwtw0pefs.*": "l_aja_twty01sr1",
+    r"lukcm01efs.*": "l_emea_ukcm01",
+    r"lukwg01efs.*": "l_emea_ukwg01",
+    r"lusaz01efs.*": "l_amrs_usaz01",
+    r"lusaz07efs.*": "l_amrs_usaz07",
+    r"lusil05efs.*": "l_amrs_usil05",
+    r"luspa01efs.*": "l_amrs_uspa01",
+    r"lustx02efs.*": "l_amrs_ustx02",
+    r"lusva01efs.*": "l_amrs_usva01",
+}
+
+UNKNOWN_GROUP = "Unknown Group"
+
+# A YAML file of more pattern: group entries, checked before PATTERN_TO_GROUP; set with --group-map
+GROUP_MAP_ENV = 'EFS_VALIDATION_GROUP_MAP'
+
+# The l_<region>_<site> groups whose hosts teach which host-name prefix belongs where
+SITE_GROUP = re.compile(r"l_[a-zA-Z0-9_-]+_[a-zA-Z0-9]+")
+
+# Patterns of the form "<literal prefix>.*" can be resolved with a dict lookup
+_LITERAL_PREFIX = re.compile(r"([A-Za-z0-9_-]*)\.\*")
+
+
+class GroupResolver:
+    """Resolve a server name to its l_<region>_<site> group with few lookups.
+
+    Literal-prefix patterns are indexed by prefix; anything else is compiled on
+    its own and tried in mapping order, only while it could still beat the
+    prefix hit. When several patterns match, the one listed first in the
+    mapping wins, as with re.match in order. Patterns are not combined into one
+    regex, so inline flags and backreferences keep their meaning.
+    """
+
+    def __init__(self, pattern_to_group):
+        self._prefixes = {}  # prefix -> (position in mapping, group)
+        self._regexes = []   # (position in mapping, compiled pattern, group), in mapping order
+        for position, (pattern, group) in enumerate(pattern_to_group.items()):
+            literal = _LITERAL_PREFIX.fullmatch(pattern)
+            if literal:
+                self._prefixes.setdefault(literal.group(1), (position, group))
+            else:
+                self._regexes.append((position, re.compile(pattern), group))
+        self._prefix_lengths = sorted({len(prefix) for prefix in self._prefixes})
+
+        self.mapping = dict(pattern_to_group)
+
+    def resolve(self, server_name, default=UNKNOWN_GROUP):
+        best = None
+        prefixes = self._prefixes
+        for length in self._prefix_lengths:
+            hit = prefixes.get(server_name[:length])
+            if hit is not None and (best is None or hit[0] < best[0]):
+                best = hit
+        for position, regex, group in self._regexes:
+            if best is not None and position > best[0]:
+                break
+            if regex.match(server_name):
+                best = (position, group)
+                break
+        return best[1] if best is not None else default
+
+
+@lru_cache(maxsize=None)
+def _default_resolver():
+    return GroupResolver(PATTERN_TO_GROUP)
+
+
+# Function to determine the group for a new server based on its name using the pattern-to-group mapping
+def determine_group_from_pattern(server_name):
+    return _default_resolver().resolve(server_name)
+
+
+# Function to read the pattern: group entries of a group map file
+def load_group_map(path):
+    """The ``pattern: group`` mapping in the YAML file at ``path``, in file order."""
+    with open(path, 'rb') as file:
+        group_map = yaml.safe_load(file) or {}
+    if not isinstance(group_map, dict) or not all(isinstance(pattern, str) and isinstance(group, str)
+                                                  for pattern, group in group_map.items()):
+        raise ValueError(f"{path}: expected a mapping of host-name patterns to group names")
+    for pattern in group_map:
+        try:
+            re.compile(pattern)
+        except re.error as e:
+            raise ValueError(f"{path}: invalid pattern {pattern!r}: {e}") from None
+    return group_map
+
+
+def host_prefix(host):
+    """The site part of a host name, up to and including 'efs' (``lauau2pefs`` of ``lauau2pefsp000000``), or None."""
+    head, efs, _ = host.partition('efs')
+    return head + efs if efs else None
+
+
+# Function to learn which site group each host-name prefix belongs to from the inventory's own placement
+def learn_group_prefixes(group_hosts):
+    """prefix -> group for every prefix more than half of whose hosts are listed in that l_<region>_<site> group."""
+    counts = {}
+    for group, hosts in group_hosts.items():
+        if not SITE_GROUP.fullmatch(group):
+            continue
+        for host in hosts:
+            prefix = host_prefix(host)
+            if prefix is not None:
+                counts.setdefault(prefix, Counter())[group] += 1
+    learned = {}
+    for prefix in sorted(counts):
+        (group, count), = counts[prefix].most_common(1)
+        if 2 * count > sum(counts[prefix].values()):
+            learned[prefix] = group
+    return learned
+
+
+def group_resolver(learned_prefixes=None, group_map=None):
+    """One GroupResolver over the ``group_map`` file's entries, then PATTERN_TO_GROUP, then the learned prefixes.
+
+    Earlier entries win, so a configured or built-in pattern always beats
+    what was learned. ``group_map`` defaults to ``$EFS_VALIDATION_GROUP_MAP``.
+    """
+    group_map = group_map if group_map is not None else os.environ.get(GROUP_MAP_ENV)
+    mapping = dict(load_group_map(group_map)) if group_map else {}
+    for pattern, group in PATTERN_TO_GROUP.items():
+        mapping.setdefault(pattern, group)
+    for prefix, group in (learned_prefixes or {}).items():
+        mapping.setdefault(re.escape(prefix) + '.*', group)
+    return GroupResolver(mapping)
@@ -0,0 +1,198 @@
+"""Re-validate only the hosts that changed since the previous run.
+
+The EFS and inventory data of the last run are persisted together with its
+findings. The next run diffs the fresh data against them and re-runs the
+per-host checks (missing/extra server, cells, servertype placement) for the
+changed hosts only, and the control-group balance for the data centers those
+hosts were or are in. Everything else is carried over from the saved findings.
+"""
+
+import os
+from dataclasses import dataclass
+
+from efs_validation.cache import cache_path, load_pickle, save_pickle
+from efs_validation.checks import (check_control_group_balance, check_servertype_placement, check_unassigned_servers,
+                                   compare_inventory_with_efs)
+from efs_validation.findings import SECTIONS, Findings, UnassignedServers
+from efs_validation.groups import determine_group_from_pattern
+from efs_validation.inventory import MEMBERSHIP_GROUPS
+
+# Bump whenever the saved layout or the meaning of a check changes
+STATE_VERSION = 5
+
+_ABSENT = object()
+
+
+@dataclass
+class ValidationState:
+    """What the previous run saw and found."""
+
+    version: int
+    key: tuple
+    efs: dict        # server -> (cells, host_type)
+    inventory: dict  # host -> (cells, group, servertype/controlgroup memberships)
+    findings: Findings
+
+
+@dataclass
+class IncrementalStats:
+    full: bool
+    changed_hosts: int
+    rechecked_cells: int
+
+    def __str__(self):
+        if self.full:
+            return "Full validation"
+        return f"Incremental validation: {self.changed_hosts} changed hosts, {self.rechecked_cells} data centers re-checked"
+
+
+def inventory_signatures(index):
+    host_group = index.host_group
+    signatures = {}
+    for host, cells in index.host_cells.items():
+        memberships = frozenset(group for group in index.host_groups[host] if group in MEMBERSHIP_GROUPS)
+        signatures[host] = (cells, host_group.get(host), memberships)
+    return signatures
+
+
+def changed_keys(previous, current):
+    """Keys added, removed or changed between two signature maps."""
+    changed = {key for key, value in current.items() if previous.get(key, _ABSENT) != value}
+    changed.update(key for key in previous if key not in current)
+    return changed
+
+
+def state_key(session):
+    """What the saved findings depend on besides the data: the sources, and how missing servers get a group."""
+    return (str(session.efs_source), os.path.abspath(session.inventory_file),
+            repr(list(session.group_resolver.mapping.items())))
+
+
+def default_state_file(session):
+    return cache_path('state', str(session.efs_source), os.path.abspath(session.inventory_file))
+
+
+def load_state(state_file, key=None):
+    """The saved state, or None if there is none usable (for ``key``, if given)."""
+    state = load_pickle(state_file)
+    if not isinstance(state, ValidationState) or state.version != STATE_VERSION:
+        return None
+    if key is not None and state.key != key:
+        return None
+    return state
+
+
+def save_state(state_file, state):
+    save_pickle(state_file, state)
+
+
+def _subset(mapping, keys):
+    return {key: mapping[key] for key in keys if key in mapping}
+
+
+def check_hosts(efs_servers, index, hosts, cells, resolve_group=determine_group_from_pattern):
+    """Findings of the per-host checks for just ``hosts``, and of the balance check for just ``cells``.
+
+    ``index`` is an :class:`~efs_validation.inventory.InventoryIndex`. Every EFS
+    server in one of ``cells`` is counted towards its balance, changed or not.
+    """
+    host_efs = _subset(efs_servers, hosts)
+    missing_servers, extra_servers, cell_mismatches = compare_inventory_with_efs(
+        host_efs, _subset(index.host_cells, hosts), index.host_group, resolve_group)
+    servertype_mismatches = check_servertype_placement(
+        host_efs, index.members('servertype_dev'), index.members('servertype_prod'))
+    cell_members = {name: server for name, server in efs_servers.items() if not server.cells.isdisjoint(cells)}
+    imbalances = [imbalance for imbalance in check_control_group_balance(
+        cell_members, index.members('controlgroup_a'), index.members('controlgroup_b')) if imbalance.cell in cells]
+    return Findings(missing_servers, extra_servers, cell_mismatches, servertype_mismatches, imbalances)
+
+
+def revalidate(session, previous, changed_hosts, changed_cells):
+    """Merge the previous findings with fresh checks of the changed hosts and cells."""
+    efs_servers = session.efs.servers
+    inventory = session.inventory
+    server_cells = inventory.index.host_cells
+    fresh = check_hosts(efs_servers, inventory.index, changed_hosts, changed_cells, session.group_resolver.resolve)
+
+    def keep(findings, key):
+        return [finding for finding in findings if key(finding) not in changed_hosts]
+
+    old = previous.findings
+    findings = Findings(
+        missing_servers=keep(old.missing_servers, lambda f: f.server) + fresh.missing_servers,
+        extra_servers=keep(old.extra_servers, lambda f: f.server) + fresh.extra_servers,
+        cell_mismatches=keep(old.cell_mismatches, lambda f: f.server) + fresh.cell_mismatches,
+        servertype_mismatches=keep(old.servertype_mismatches, lambda f: f.server) + fresh.servertype_mismatches,
+        controlgroup_mismatches=[finding for finding in old.controlgroup_mismatches
+                                 if not isinstance(finding, UnassignedServers) and finding.cell not in changed_cells]
+        + fresh.controlgroup_mismatches,
+    )
+
+    # Put everything back in the order a full run reports it
+    efs_position = {name: position for position, name in enumerate(efs_servers)}
+    inventory_position = {name: position for position, name in enumerate(server_cells)}
+    findings.missing_servers.sort(key=lambda f: efs_position[f.server])
+    findings.cell_mismatches.sort(key=lambda f: efs_position[f.server])
+    findings.servertype_mismatches.sort(key=lambda f: efs_position[f.server])
+    findings.extra_servers.sort(key=lambda f: inventory_position[f.server])
+    findings.controlgroup_mismatches.sort(key=lambda f: (min(
+        efs_position[name] for name in f.controlgroup_a_dev + f.controlgroup_a_prod
+        + f.controlgroup_b_dev + f.controlgroup_b_prod), f.cell))
+    findings.controlgroup_mismatches += check_unassigned_servers(
+        efs_servers, inventory.controlgroup_a, inventory.controlgroup_b)
+    return findings
+
+
+def validate_since(session, previous):
+    """Validate the session, re-checking only what changed since ``previous``.
+
+    ``previous`` is the :class:`ValidationState` of an earlier validation, or
+    None to run every check from scratch, as is done when it was made with
+    another group mapping (e.g. one learned from an earlier inventory).
+    Returns ``(findings, stats, state)``, ``state`` being what to pass as
+    ``previous`` next time.
+    """
+    profile = session.profile
+    session.load()
+    key = state_key(session)
+    if previous is not None and previous.key != key:
+        previous = None
+    with profile.stage('state_diff'):
+        efs = session.efs.signatures  # Worked out once per EFS snapshot, however often the inventory changes
+        inventory = inventory_signatures(session.inventory.index)
+        if previous is not None:
+            changed_hosts = changed_keys(previous.efs, efs) | changed_keys(previous.inventory, inventory)
+            changed_cells = {cell for host in changed_hosts
+                             for signature in (previous.efs.get(host), efs.get(host)) if signature is not None
+                             for cell in signature[0]}
+
+    if previous is None:
+        findings = session.validate()
+        stats = IncrementalStats(full=True, changed_hosts=len(efs.keys() | inventory.keys()), rechecked_cells=0)
+    else:
+        with profile.stage('revalidate'):
+            findings = revalidate(session, previous, changed_hosts, changed_cells)
+        stats = IncrementalStats(full=False, changed_hosts=len(changed_hosts), rechecked_cells=len(changed_cells))
+
+    profile.count('changed_hosts', stats.changed_hosts)
+    for attribute, _, _ in SECTIONS:
+        profile.count(attribute, len(getattr(findings, attribute)))
+    return findings, stats, ValidationState(STATE_VERSION, key, efs, inventory, findings)
+
+
+def validate_incremental(session, state_file=None, full=False):
+    """Validate the session, re-checking only what changed since the saved state.
+
+    Returns ``(findings, stats)``. With ``full=True``, or when there is no
+    usable saved state, every check runs from scratch. Either way the state is
+    saved for the next run.
+    """
+    state_file = state_file or default_state_file(session)
+    profile = session.profile
+    with profile.stage('state_load'):
+        # The key needs the loaded inventory, so validate_since checks it once that is loaded in its own stage
+        previous = None if full else load_state(state_file)
+    findings, stats, state = validate_since(session, previous)
+    with profile.stage('state_save'):
+        save_state(state_file, state)
+    return findings, stats
@@ -0,0 +1,330 @@
+import hashlib
+import os
+import sys
+import time
+from array import array
+from functools import cached_property
+
+import yaml
+
+from efs_validation.cache import cache_path, load_pickle, save_pickle
+from efs_validation.groups import SITE_GROUP, learn_group_prefixes
+from efs_validation.yamlstream import FullLoadNeeded, extract_from_events
+
+# Prefer the libyaml-backed loader; the pure-Python one dominates run time on large inventories
+try:
+    from yaml import CSafeLoader as SafeLoader
+except ImportError:
+    from yaml import SafeLoader
+
+
+# How InventorySnapshot reads the YAML: only the groups, hosts and cells from the event stream, or all of it
+INVENTORY_PARSERS = ('stream', 'full')
+
+
+# Function to load the YAML inventory file
+def load_inventory(file_path):
+    with open(file_path, 'rb') as file:
+        return yaml.load(file, Loader=SafeLoader)
+
+
+# Function to read only the groups, hosts and cells of the YAML inventory file
+def extract_inventory(file_path):
+    """The inventory reduced to what build_inventory_index reads, loading all of it only if it has to."""
+    with open(file_path, 'rb') as file:
+        try:
+            return extract_from_events(yaml.parse(file, Loader=SafeLoader))
+        except FullLoadNeeded:
+            pass
+    return load_inventory(file_path)
+
+
+# Function to parse inventory YAML that is already in memory, e.g. read from git
+def parse_inventory_bytes(data, parser='stream'):
+    if parser == 'stream':
+        try:
+            return extract_from_events(yaml.parse(data, Loader=SafeLoader))
+        except FullLoadNeeded:
+            pass
+    return yaml.load(data, Loader=SafeLoader)
+
+
+_NO_CELLS = _NO_HOSTS = frozenset()
+
+# Groups whose direct hosts the servertype and control group checks look at
+MEMBERSHIP_GROUPS = ('servertype_dev', 'servertype_prod', 'controlgroup_a', 'controlgroup_b')
+
+
+class InventoryIndex:
+    """Every host and group of an inventory, indexed for O(1) lookups.
+
+    ``group_hosts`` maps each group, in document order, to the frozenset of
+    hosts listed directly under it. ``host_groups`` maps each host to the
+    groups listing it, ``host_cells`` to the union of the cells declared for it
+    in any of them, and ``host_group`` to the group it is placed in: the last
+    one declaring its cells, or else the last one listing it.
+    ``site_group`` and ``site_cells`` only look at the ``l_<region>_<site>``
+    groups: the last of them listing each host, and the union of the cells
+    declared there, for every host listed in one.
+    ``group_prefixes`` maps host-name prefixes to the site group their hosts
+    are listed in (see :func:`~efs_validation.groups.learn_group_prefixes`).
+    """
+
+    __slots__ = ('group_hosts', 'host_groups', 'host_cells', 'host_group', 'site_group', 'site_cells',
+                 'group_prefixes')
+
+    def __init__(self, group_hosts, host_groups, host_cells, host_group, site_group, site_cells,
+                 group_prefixes=None):
+        self.group_hosts = group_hosts
+        self.host_groups = host_groups
+        self.host_cells = host_cells
+        self.host_group = host_group
+        self.site_group = site_group
+        self.site_cells = site_cells
+        self.group_prefixes = group_prefixes if group_prefixes is not None else learn_group_prefixes(group_hosts)
+
+    def members(self, group):
+        """Hosts listed directly under ``group``; empty if there is no such group."""
+        return self.group_hosts.get(group, _NO_HOSTS)
+
+
+# Function to index every host and group of the YAML inventory in one iterative walk
+def build_inventory_index(inventory):
+    group_hosts = {}
+    host_groups = {}
+    host_cells = {}
+    host_group = {}
+    site_group = {}
+    site_cells = {}
+    placed = set()  # hosts whose group came from a listing that declares cells
+    intern = sys.intern  # shared with the interned EFS cell names, so comparing cell sets is cheap
+
+    root = inventory.get('all') if isinstance(inventory, dict) else None
+    stack = [('all', root)]
+    while stack:
+        group, group_data = stack.pop()
+        if group_data is None:
+            group_hosts.setdefault(group, _NO_HOSTS)  # A group declared with no body
+            continue
+        if not isinstance(group_data, dict):
+            print(f"Skipping invalid group {group}: {group_data}")
+            continue
+        hosts = group_data.get('hosts')
+        if not isinstance(hosts, dict):
+            group_hosts.setdefault(group, _NO_HOSTS)
+        else:
+            group_hosts[group] = group_hosts.get(group, _NO_HOSTS) | frozenset(hosts)
+            site = SITE_GROUP.match(group)
+            for host, data in hosts.items():
+                groups = host_groups.get(host)
+                if groups is None:
+                    host_groups[host] = [group]
+                elif group not in groups:
+                    groups.append(group)
+                cells = None
+                if isinstance(data, dict) and 'cells' in data:
+                    cells = frozenset(intern(str(cell).strip()) for cell in data['cells'] or ())
+                    host_cells[host] = host_cells[host] | cells if host in placed else cells
+                    host_group[host] = group
+                    placed.add(host)
+                elif host not in placed:
+                    host_cells[host] = _NO_CELLS
+                    host_group[host] = group
+                if site:
+                    site_group[host] = group
+                    site_cells[host] = site_cells.get(host, _NO_CELLS) | (cells or _NO_CELLS)
+        children = group_data.get('children')
+        if isinstance(children, dict):
+            # Reversed so the stack pops the children in document order
+            stack.extend(reversed(children.items()))
+
+    return InventoryIndex(
+        group_hosts=group_hosts,
+        host_groups={host: tuple(groups) for host, groups in host_groups.items()},
+        host_cells=host_cells,
+        host_group=host_group,
+        site_group=site_group,
+        site_cells=site_cells,
+    )
+
+
+# Bump whenever InventoryIndex or the encoding below changes
+INVENTORY_CACHE_VERSION = 3
+
+
+def encode_index(index):
+    """Pack an InventoryIndex into names, a table of distinct cell sets and group lists, and int arrays.
+
+    Most hosts share one of a handful of cell sets and group lists, so each
+    host is stored as indexes into those tables rather than as its own sets.
+    """
+    labels = {}  # group and cell names -> id
+    combos = {}  # ('cells' | 'groups', label ids...) -> id
+
+    def label(name):
+        label_id = labels.get(name)
+        if label_id is None:
+            label_id = labels[name] = len(labels)
+        return label_id
+
+    def combo(key):
+        combo_id = combos.get(key)
+        if combo_id is None:
+            combo_id = combos[key] = len(combos)
+        return combo_id
+
+    hosts = list(index.host_cells)
+    host_ids = {host: host_id for host_id, host in enumerate(hosts)}
+    host_cells = array('I', [combo(('cells',) + tuple(sorted(map(label, index.host_cells[host])))) for host in hosts])
+    host_groups = array('I', [combo(('groups',) + tuple(map(label, index.host_groups[host]))) for host in hosts])
+    host_group = array('I', [label(index.host_group[host]) for host in hosts])
+    site_hosts = array('I', map(host_ids.__getitem__, index.site_group))
+    site_group = array('I', [label(group) for group in index.site_group.values()])
+    site_cells = array('I', [combo(('cells',) + tuple(sorted(map(label, index.site_cells[host]))))
+                             for host in index.site_group])
+    group_hosts = [(label(group), array('I', sorted(map(host_ids.__getitem__, members))).tobytes())
+                   for group, members in index.group_hosts.items()]
+    return (hosts, list(labels), list(combos), host_cells.tobytes(), host_groups.tobytes(), host_group.tobytes(),
+            site_hosts.tobytes(), site_group.tobytes(), site_cells.tobytes(), group_hosts, index.group_prefixes)
+
+
+def decode_index(encoded):
+    """The InventoryIndex packed by :func:`encode_index`, with its group and cell names interned."""
+    (hosts, labels, combos, host_cells, host_groups, host_group, site_hosts, site_group, site_cells,
+     group_hosts, group_prefixes) = encoded
+    labels = list(map(sys.intern, labels))
+    label = labels.__getitem__
+    combos = [frozenset(map(label, key[1:])) if key[0] == 'cells' else tuple(map(label, key[1:]))
+              for key in combos]
+    combo = combos.__getitem__
+    host = hosts.__getitem__
+    site_hosts = list(map(host, memoryview(site_hosts).cast('I')))
+    return InventoryIndex(
+        group_hosts={label(group): frozenset(map(host, memoryview(members).cast('I')))
+                     for group, members in group_hosts},
+        host_groups=dict(zip(hosts, map(combo, memoryview(host_groups).cast('I')))),
+        host_cells=dict(zip(hosts, map(combo, memoryview(host_cells).cast('I')))),
+        host_group=dict(zip(hosts, map(label, memoryview(host_group).cast('I')))),
+        site_group=dict(zip(site_hosts, map(label, memoryview(site_group).cast('I')))),
+        site_cells=dict(zip(site_hosts, map(combo, memoryview(site_cells).cast('I')))),
+        group_prefixes=group_prefixes,
+    )
+
+
+def file_digest(file_path):
+    digest = hashlib.blake2b()
+    with open(file_path, 'rb') as file:
+        for chunk in iter(lambda: file.read(1 << 20), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+# Function to load the index an earlier run saved for an unchanged inventory file
+def load_cached_index(inventory_file):
+    """(index, key): the saved InventoryIndex of this exact file content, or None, and the key to save under.
+
+    An entry whose mtime and size still match is used without reading the
+    file; otherwise the content hash decides, so a touched but unchanged
+    inventory is still a hit.
+    """
+    path = cache_path('inventory', os.path.abspath(inventory_file))
+    stat = os.stat(inventory_file)
+    entry = load_pickle(path)
+    if not (isinstance(entry, tuple) and len(entry) == 5 and entry[0] == INVENTORY_CACHE_VERSION):
+        entry = None
+    if entry is not None and entry[1:3] == (stat.st_mtime_ns, stat.st_size):
+        return decode_index(entry[4]), None
+    key = (stat.st_mtime_ns, stat.st_size, file_digest(inventory_file))
+    if entry is not None and entry[2:4] == key[1:]:
+        save_pickle(path, (INVENTORY_CACHE_VERSION,) + key + (entry[4],))  # Remember the new mtime
+        return decode_index(entry[4]), None
+    return None, key
+
+
+def save_cached_index(inventory_file, key, index):
+    """Save ``index`` under the ``key`` load_cached_index returned, unless the file changed while it was parsed."""
+    stat = os.stat(inventory_file)
+    if (stat.st_mtime_ns, stat.st_size) != key[:2]:
+        return
+    save_pickle(cache_path('inventory', os.path.abspath(inventory_file)),
+                (INVENTORY_CACHE_VERSION,) + key + (encode_index(index),))
+
+
+class InventorySnapshot:
+    """The Ansible inventory, parsed once the first time any part of it is needed.
+
+    Every validation stage reads from the same parsed document; ``parse_seconds``
+    records how long the YAML load took. The ``'stream'`` parser keeps only
+    what the checks read (see :mod:`efs_validation.yamlstream`), ``'full'``
+    loads the whole document. With ``use_cache`` the index is read from the
+    cache directory while the file is unchanged, and ``cache_hit`` says
+    whether it was.
+    """
+
+    def __init__(self, inventory_file, use_cache=False, parser='stream'):
+        self.inventory_file = inventory_file
+        self.use_cache = use_cache
+        self.parser = parser
+        self.parse_seconds = None
+        self.cache_hit = None
+        self._cache_key = None
+
+    @cached_property
+    def data(self):
+        start = time.perf_counter()
+        if self.parser == 'stream':
+            inventory = extract_inventory(self.inventory_file)
+        else:
+            inventory = load_inventory(self.inventory_file)
+        self.parse_seconds = time.perf_counter() - start
+        return inventory
+
+    @cached_property
+    def cached_index(self):
+        """The index saved for this file content by an earlier run, or None."""
+        if not self.use_cache:
+            return None
+        start = time.perf_counter()
+        index, self._cache_key = load_cached_index(self.inventory_file)
+        self.cache_hit = index is not None
+        if self.cache_hit:
+            self.parse_seconds = time.perf_counter() - start
+        return index
+
+    @cached_property
+    def index(self):
+        """The :class:`InventoryIndex` every check queries."""
+        if self.cached_index is not None:
+            return self.cached_index
+        index = build_inventory_index(self.data)
+        if self._cache_key is not None:
+            save_cached_index(self.inventory_file, self._cache_key, index)
+        return index
+
+    @property
+    def cache_status(self):
+        """'hit', 'miss' or 'off', for the run output."""
+        if self.cache_hit is None:
+            return 'off'
+        return 'hit' if self.cache_hit else 'miss'
+
+    @cached_property
+    def controlgroup_a(self):
+        return self.index.members('controlgroup_a')
+
+    @cached_property
+    def controlgroup_b(self):
+        return self.index.members('controlgroup_b')
+
+    @cached_property
+    def servertype_dev(self):
+        return self.index.members('servertype_dev')
+
+    @cached_property
+    def servertype_prod(self):
+        return self.index.members('servertype_prod')
+
+    @cached_property
+    def servers_and_cells(self):
+        """(host -> cells, host -> group) over every host in the inventory."""
+        return self.index.host_cells, self.index.host_group
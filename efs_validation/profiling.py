@@ -0,0 +1,92 @@
+"""Stage timings, counters and peak RSS for one validation run.
+
+A disabled :class:`Profile` (the default) makes every call a no-op, so the
+pipeline can be instrumented unconditionally.
+"""
+
+import cProfile
+import json
+import sys
+import time
+from contextlib import contextmanager
+
+try:
+    import resource
+except ImportError:  # Not available on Windows
+    resource = None
+
+
+def peak_rss_kb():
+    """Peak resident set size of this process in KiB, or None if unknown."""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak // 1024 if sys.platform == 'darwin' else peak  # macOS reports bytes
+
+
+class Profile:
+    """Where a validation run spent its time, and on how much data."""
+
+    def __init__(self, enabled=False, cprofile_file=None):
+        self.enabled = enabled
+        self.cprofile_file = cprofile_file
+        self.stages = {}    # stage -> seconds, summed over repeated entries, in first-entered order
+        self.counters = {}  # name -> value
+
+    @contextmanager
+    def stage(self, name):
+        """Time the body of the ``with`` block as ``name``."""
+        if not self.enabled:
+            yield
+            return
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.stages[name] = self.stages.get(name, 0.0) + time.perf_counter() - start
+
+    def count(self, name, value):
+        if self.enabled:
+            self.counters[name] = value
+
+    def call(self, func, *args, **kwargs):
+        """Call ``func``, under cProfile when a dump file was requested."""
+        if not (self.enabled and self.cprofile_file):
+            return func(*args, **kwargs)
+        profiler = cProfile.Profile()
+        try:
+            return profiler.runcall(func, *args, **kwargs)
+        finally:
+            profiler.dump_stats(self.cprofile_file)
+
+    def as_dict(self):
+        return {
+            'stages': {name: round(seconds, 6) for name, seconds in self.stages.items()},
+            'total_seconds': round(sum(self.stages.values()), 6),
+            'counters': dict(self.counters),
+            'peak_rss_kb': peak_rss_kb(),
+        }
+
+    def write_json(self, path):
+        if not self.enabled:
+            return
+        with open(path, 'w') as file:
+            json.dump(self.as_dict(), file, indent=2)
+            file.write("\n")
+
+    def footer_lines(self):
+        """Human readable summary for the end of a report; empty when disabled."""
+        if not self.enabled:
+            return []
+        profile = self.as_dict()
+        lines = ["Profile:"]
+        lines += [f"  {name:<24}{seconds:>10.3f}s" for name, seconds in profile['stages'].items()]
+        lines.append(f"  {'total':<24}{profile['total_seconds']:>10.3f}s")
+        lines += [f"  {name:<24}{value:>10}" for name, value in profile['counters'].items()]
+        if profile['peak_rss_kb'] is not None:
+            lines.append(f"  {'peak RSS':<24}{profile['peak_rss_kb'] / 1024:>9.1f}M")
+        return lines
+
+
+# Shared by everything that was not handed a profile
+DISABLED = Profile()
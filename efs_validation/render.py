@@ -0,0 +1,259 @@
+import csv
+import html
+import json
+import os
+from contextlib import contextmanager
+
+from efs_validation.findings import RECORD_FIELDS, flat_record
+
+SEPARATOR = "=" * 56
+
+REPORT_TITLE = "Ansible Inventory Validation Report"
+
+
+def write_text_report(findings, output, profile=None, notes=()):
+    """Write ``notes`` (e.g. how old the data is), the findings one section at a time, then the profile footer if any."""
+    for note in notes:
+        output.write(note + "\n")
+    if notes:
+        output.write("\n")
+    for title, items, ok_message in findings.sections():
+        output.write(f"{title}\n{SEPARATOR}\n")
+        if items:
+            for finding in items:
+                for line in finding.lines():
+                    output.write(line + "\n")
+        else:
+            output.write(ok_message + "\n")
+        output.write("\n")
+    footer = profile.footer_lines() if profile is not None else []
+    if footer:
+        output.write(f"{SEPARATOR}\n" + "\n".join(footer) + "\n")
+
+
+HTML_HEADER = """<!DOCTYPE html>
+<html>
+<head>
+    <meta charset="utf-8">
+    <title>Validation Report</title>
+    <style>
+        body { font-family: Arial, sans-serif; background-color: #f8f9fa; padding: 20px; }
+        h2 { text-align: center; color: #333; }
+        table { width: 100%; border-collapse: collapse; background: white; box-shadow: 0px 0px 10px rgba(0, 0, 0, 0.1); margin-bottom: 20px; }
+        th, td { border: 1px solid #ddd; padding: 12px; text-align: left; vertical-align: top; }
+        th { background-color: #007bff; color: white; font-size: 16px; text-align: center; }
+        td { font-size: 14px; }
+        pre { white-space: pre-wrap; font-family: monospace; font-size: 13px; margin: 0; padding: 5px; background-color: #f4f4f4; border-radius: 5px; }
+        tr:nth-child(even) { background-color: #f2f2f2; }
+        .details-column { white-space: pre-wrap; font-family: monospace; padding-left: 10px; }
+        .controls { margin-bottom: 10px; }
+        .controls input { width: 40%; }
+        .controls input, .controls select, .controls button { font-size: 14px; padding: 4px; margin-right: 6px; }
+    </style>
+</head>
+<body>
+    <h2>Ansible Inventory Validation Report</h2>
+    <table>
+        <tr>
+            <th style="width: 30%;">Validations</th>
+            <th style="width: 70%;">Details</th>
+        </tr>
+"""
+
+# Closes the summary and opens the findings table the script below fills in
+HTML_FINDINGS = """    </table>
+    <div class="controls">
+        <input id="filter" type="search" placeholder="Filter findings, e.g. a server or cell name">
+        <select id="section"><option value="">All validations</option></select>
+        <button id="prev">&laquo; Previous</button><button id="next">Next &raquo;</button>
+        <span id="status"></span>
+    </div>
+    <table>
+        <thead><tr><th style="width: 30%;">Validation</th><th style="width: 70%;">Finding</th></tr></thead>
+        <tbody id="rows"><tr><td colspan="2">Enable JavaScript to browse the findings.</td></tr></tbody>
+    </table>
+"""
+
+HTML_FOOTER = """    <script>
+    (function () {
+        var PAGE_SIZE = 100;
+        var sections = JSON.parse(document.getElementById('sections-data').textContent);
+        var rows = JSON.parse(document.getElementById('findings-data').textContent);
+        var search = rows.map(function (row) { return row[1].toLowerCase(); });
+        var filter = document.getElementById('filter'), section = document.getElementById('section');
+        var body = document.getElementById('rows'), status = document.getElementById('status');
+        var shown = rows.map(function (row, i) { return i; }), page = 0, timer = null;
+
+        sections.forEach(function (title, i) { section.add(new Option(title, i)); });
+
+        function apply() {
+            var text = filter.value.toLowerCase(), wanted = section.value;
+            shown = [];
+            for (var i = 0; i < rows.length; i++) {
+                if ((wanted === '' || rows[i][0] == wanted) && (!text || search[i].indexOf(text) >= 0)) {
+                    shown.push(i);
+                }
+            }
+            page = 0;
+            render();
+        }
+
+        function render() {
+            var pages = Math.max(1, Math.ceil(shown.length / PAGE_SIZE));
+            page = Math.min(Math.max(page, 0), pages - 1);
+            var fragment = document.createDocumentFragment();
+            shown.slice(page * PAGE_SIZE, (page + 1) * PAGE_SIZE).forEach(function (i) {
+                var tr = document.createElement('tr'), title = document.createElement('td');
+                var details = document.createElement('td'), pre = document.createElement('pre');
+                title.textContent = sections[rows[i][0]];
+                details.className = 'details-column';
+                pre.textContent = rows[i][1];
+                details.appendChild(pre);
+                tr.appendChild(title);
+                tr.appendChild(details);
+                fragment.appendChild(tr);
+            });
+            body.replaceChildren(fragment);
+            status.textContent = shown.length + ' of ' + rows.length + ' findings, page ' + (page + 1) + ' of ' + pages;
+        }
+
+        filter.addEventListener('input', function () { clearTimeout(timer); timer = setTimeout(apply, 150); });
+        section.addEventListener('change', apply);
+        document.getElementById('prev').addEventListener('click', function () { page--; render(); });
+        document.getElementById('next').addEventListener('click', function () { page++; render(); });
+        render();
+    })();
+    </script>
+</body>
+</html>
+"""
+
+_encode_json = json.JSONEncoder(separators=(',', ':')).encode
+
+
+def _script_json(value):
+    """Compact JSON that is safe inside a <script> element."""
+    return _encode_json(value).replace('<', '\\u003c')
+
+
+def write_html_report(findings, output_html="validation_report.html", profile=None, notes=()):
+    """Write the :func:`render_html_report` page to ``output_html``."""
+    with open(output_html, 'w') as file:
+        render_html_report(findings, file, profile, notes)
+
+
+def render_html_report(findings, file, profile=None, notes=()):
+    """Write a summary table plus a paginated, filterable table of every finding to an open file.
+
+    The findings are streamed into the page as a compact JSON array, one row at
+    a time, and the browser only draws the current page of them, so neither
+    writing nor opening the report slows down with tens of thousands of rows.
+    """
+    file.write(HTML_HEADER)
+    if notes:
+        file.write("        <tr><td>Data sources</td><td class='details-column'><pre>"
+                   + html.escape("\n".join(notes)) + "</pre></td></tr>\n")
+    titles = []
+    for title, items, ok_message in findings.sections():
+        titles.append(title)
+        summary = f"{len(items)} findings" if items else ok_message
+        file.write(f"        <tr><td>{html.escape(title)}</td><td class='details-column'>{html.escape(summary)}</td></tr>\n")
+    footer = profile.footer_lines() if profile is not None else []
+    if footer:
+        file.write(f"        <tr><td>{html.escape(footer[0])}</td><td class='details-column'><pre>"
+                   + html.escape("\n".join(footer[1:])) + "</pre></td></tr>\n")
+    file.write(HTML_FINDINGS)
+
+    file.write(f'    <script type="application/json" id="sections-data">{_script_json(titles)}</script>\n')
+    file.write('    <script type="application/json" id="findings-data">[')
+    separator = ''
+    for index, (_, items, _) in enumerate(findings.sections()):
+        for finding in items:
+            file.write(separator + _script_json([index, "\n".join(finding.lines())]))
+            separator = ',\n'
+    file.write(']</script>\n')
+    file.write(HTML_FOOTER)
+
+
+FINDINGS_FORMATS = ('jsonl', 'csv')
+
+
+class JsonlFindingWriter:
+    """Writes each finding it is called with as one JSON line, flushed straight away."""
+
+    def __init__(self, file):
+        self.file = file
+        self.count = 0
+
+    def __call__(self, finding):
+        self.file.write(_encode_json(flat_record(finding)) + "\n")
+        self.file.flush()
+        self.count += 1
+
+
+class CsvFindingWriter:
+    """Writes each finding it is called with as one CSV row under a RECORD_FIELDS header; lists are space separated."""
+
+    def __init__(self, file):
+        self.file = file
+        self.count = 0
+        self.writer = csv.writer(file)
+        self.writer.writerow(RECORD_FIELDS)
+        file.flush()
+
+    def __call__(self, finding):
+        record = flat_record(finding)
+        self.writer.writerow([' '.join(value) if isinstance(value, list) else value for value in record.values()])
+        self.file.flush()
+        self.count += 1
+
+
+def findings_format_of(path, requested=None):
+    """The ``requested`` format, else 'csv' for a .csv file and 'jsonl' for anything else."""
+    if requested:
+        return requested
+    return 'csv' if os.path.splitext(path)[1].lower() == '.csv' else 'jsonl'
+
+
+@contextmanager
+def open_findings_writer(path, findings_format=None):
+    """A JSONL or CSV finding writer on ``path``, or None if ``path`` is None."""
+    if path is None:
+        yield None
+        return
+    writer_class = CsvFindingWriter if findings_format_of(path, findings_format) == 'csv' else JsonlFindingWriter
+    with open(path, 'w', newline='') as file:
+        yield writer_class(file)
+
+
+def write_findings(findings, writer):
+    """Pass every finding to ``writer``, in report order."""
+    for _, items, _ in findings.sections():
+        for finding in items:
+            writer(finding)
+
+
+def print_console_report(findings, profile=None, notes=()):
+    """Print the findings as a rich table, with ``notes`` first and the profile last if any."""
+    from rich.console import Console
+    from rich.table import Table
+    from rich.text import Text
+
+    table = Table(title=REPORT_TITLE, show_lines=True)
+    table.add_column("Validations", style="bold cyan", width=30)
+    table.add_column("Details", style="dim", width=70)
+
+    if notes:
+        table.add_row("Data sources", Text("\n".join(notes)))
+
+    for title, items, ok_message in findings.sections():
+        if items:
+            details = "\n".join(line for finding in items for line in finding.lines())
+        else:
+            details = ok_message
+        table.add_row(title, Text(details))
+    footer = profile.footer_lines() if profile is not None else []
+    if footer:
+        table.add_row(footer[0], Text("\n".join(footer[1:])))
+
+    Console().print(table)
@@ -0,0 +1,85 @@
+from efs_validation.efs import EfsSnapshot, EfsSource
+from efs_validation.engine import validate_fused
+from efs_validation.groups import group_resolver
+from efs_validation.inventory import InventorySnapshot
+from efs_validation.profiling import DISABLED
+
+
+class ValidationSession:
+    """Keeps the parsed EFS and inventory snapshots so validation can be re-run cheaply.
+
+    Nothing is read or queried until the first call to :meth:`validate`; later
+    calls reuse the snapshots until :meth:`reload` drops them. Pass an enabled
+    :class:`~efs_validation.profiling.Profile` to time each stage,
+    ``inventory_cache=True`` to reuse the index of an unchanged inventory, and
+    ``inventory_parser='full'`` to load the whole YAML document. ``on_finding``
+    is called with each finding as a full validation finds it. ``group_map`` is
+    a YAML file of extra host-name patterns for suggesting the group of a
+    missing server (see :func:`~efs_validation.groups.group_resolver`).
+    ``fleet_table=True`` diffs a full validation with the numpy
+    :class:`~efs_validation.fleet.FleetTable` if numpy is installed.
+    """
+
+    def __init__(self, inventory_file, efs_source=None, profile=None, inventory_cache=False,
+                 inventory_parser='stream', on_finding=None, group_map=None, fleet_table=False):
+        self.inventory_file = inventory_file
+        self.efs_source = efs_source if efs_source is not None else EfsSource()
+        self.profile = profile if profile is not None else DISABLED
+        self.inventory_cache = inventory_cache
+        self.inventory_parser = inventory_parser
+        self.on_finding = on_finding
+        self.group_map = group_map
+        self.fleet_table = fleet_table
+        self.efs = None
+        self.inventory = None
+        self._group_resolver = (None, None)
+        self.reload()
+
+    def reload(self, efs=True, inventory=True):
+        """Forget the cached snapshots so the next validation reads them again."""
+        if efs:
+            self.efs = EfsSnapshot(self.efs_source)
+        if inventory:
+            self.inventory = InventorySnapshot(self.inventory_file, self.inventory_cache, self.inventory_parser)
+
+    @property
+    def group_resolver(self):
+        """The GroupResolver of the group map and what the current inventory's placement teaches."""
+        inventory, resolver = self._group_resolver
+        if inventory is not self.inventory:
+            resolver = group_resolver(self.inventory.index.group_prefixes, self.group_map)
+            self._group_resolver = (self.inventory, resolver)
+        return resolver
+
+    def load(self):
+        """Read whatever of EFS and the inventory is not loaded yet, one profiled stage each."""
+        profile = self.profile
+        with profile.stage('efs_query'):
+            efs_servers = self.efs.servers
+        with profile.stage('yaml_load'):
+            if self.inventory.cached_index is None:  # An unchanged inventory is not parsed at all
+                self.inventory.data
+        with profile.stage('host_extraction'):
+            server_cells, _ = self.inventory.servers_and_cells
+        if profile.enabled:
+            profile.count('efs_servers', len(efs_servers))
+            profile.count('efs_cells', len({cell for server in efs_servers.values() for cell in server.cells}))
+            profile.count('inventory_hosts', len(server_cells))
+            profile.count('efs_cache_hits', int(self.efs.from_cache))
+            profile.count('inventory_cache_hits', int(self.inventory.cache_hit is True))
+            profile.count('inventory_cache_misses', int(self.inventory.cache_hit is False))
+
+    def validate(self):
+        """Run every check and return the :class:`Findings`."""
+        self.load()
+        with self.profile.stage('checks'):
+            return validate_fused(self.efs.servers, self.inventory.index, self.on_finding,
+                                  self.group_resolver.resolve, self.fleet_table)
+
+
+def run(inventory_file, efs_source=None):
+    """Validate ``inventory_file`` against EFS once and return the :class:`Findings`.
+
+    ``efs_source`` defaults to querying the live EFS database.
+    """
+    return ValidationSession(inventory_file, efs_source).validate()
@@ -0,0 +1,268 @@
+"""Re-validate an inventory every time it is saved and serve the latest findings locally.
+
+    python -m efs_validation.watch --inventory inventory.prod.yaml --port 8765
+
+The EFS snapshot, the inventory index and the last validation state stay in
+memory; each save of the inventory only re-reads the inventory and re-checks
+the hosts that changed. The findings are served as an HTML report on
+http://127.0.0.1:8765/ and as JSON on /findings.json, together with how long
+each re-validation took from noticing the change to serving its result.
+
+Changes are picked up through inotify when inotify_simple is installed, and by
+polling the file's stat otherwise.
+"""
+
+import argparse
+import io
+import json
+import os
+import threading
+import time
+from collections import deque
+from dataclasses import asdict, dataclass
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit
+
+from efs_validation.cli import add_efs_arguments, add_inventory_arguments, efs_source_from_args
+from efs_validation.findings import SECTIONS, finding_record
+from efs_validation.incremental import validate_since
+from efs_validation.render import render_html_report
+from efs_validation.session import ValidationSession
+
+try:
+    from inotify_simple import INotify, flags
+except ImportError:
+    INotify = None
+
+DEFAULT_PORT = 8765
+
+
+def _file_signature(path):
+    """What changes when a file is written or replaced, or None while it is missing or empty."""
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return None
+    if not stat.st_size:
+        return None  # Truncated by an editor that has not written the new content yet
+    return stat.st_mtime_ns, stat.st_size, stat.st_ino
+
+
+class PollingWatcher:
+    """Notices changes to a file by comparing its stat every ``interval`` seconds."""
+
+    def __init__(self, path, interval=0.5):
+        self.path = path
+        self.interval = interval
+        self.signature = _file_signature(path)
+
+    def wait(self, timeout):
+        """Block up to ``timeout`` seconds; True if the file changed."""
+        deadline = time.monotonic() + timeout
+        while True:
+            signature = _file_signature(self.path)
+            # A missing or empty file is an editor halfway through saving it; wait for the new content
+            if signature is not None and signature != self.signature:
+                self.signature = signature
+                return True
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return False
+            time.sleep(min(self.interval, remaining))
+
+
+class InotifyWatcher:
+    """Notices changes to a file through inotify on its directory.
+
+    The directory is watched rather than the file so that editors which save by
+    renaming a new file into place are seen too.
+    """
+
+    MASK = (flags.CLOSE_WRITE | flags.MOVED_TO | flags.CREATE) if INotify is not None else 0
+
+    def __init__(self, path):
+        self.name = os.path.basename(path)
+        self.inotify = INotify()
+        self.inotify.add_watch(os.path.dirname(os.path.abspath(path)), self.MASK)
+
+    def wait(self, timeout):
+        """Block up to ``timeout`` seconds; True if the file changed."""
+        deadline = time.monotonic() + timeout
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return False
+            if any(event.name == self.name for event in self.inotify.read(timeout=int(remaining * 1000))):
+                return True
+
+
+def make_watcher(path, poll_interval=0.5, use_inotify=True):
+    if use_inotify and INotify is not None:
+        return InotifyWatcher(path)
+    return PollingWatcher(path, poll_interval)
+
+
+@dataclass
+class WatchEvent:
+    """One re-validation and how long it took."""
+
+    trigger: str            # 'start', 'inventory' or 'efs'
+    finished_at: float      # time.time() when the result was served
+    latency_seconds: float  # from noticing the change to serving the result
+    validate_seconds: float
+    render_seconds: float
+    stats: str
+    findings: int
+    error: str = None
+
+    def __str__(self):
+        if self.error:
+            return f"{self.trigger}: failed after {self.latency_seconds:.3f}s: {self.error}"
+        return (f"{self.trigger}: {self.stats}, {self.findings} findings; served {self.latency_seconds:.3f}s "
+                f"after the change (validate {self.validate_seconds:.3f}s, render {self.render_seconds:.3f}s)")
+
+
+class ValidationDaemon:
+    """Holds a ValidationSession and the pages serving its latest findings."""
+
+    def __init__(self, session, history=20):
+        self.session = session
+        self.state = None      # ValidationState of the last successful validation
+        self.findings = None
+        self.events = deque(maxlen=history)
+        self.pages = {}        # path -> (content type, body), replaced whole on every validation
+
+    def revalidate(self, trigger, noticed):
+        """Re-read what ``trigger`` says changed, re-check it, and publish the result.
+
+        ``noticed`` is the time.perf_counter() at which the change was seen.
+        A failure (e.g. an inventory saved half-way) is reported and the last
+        good findings stay up.
+        """
+        session = self.session
+        error = None
+        stats = ''
+        try:
+            if trigger == 'inventory':
+                session.reload(efs=False, inventory=True)
+            elif trigger == 'efs':
+                session.reload(efs=True, inventory=False)
+            self.findings, stats, self.state = validate_since(session, self.state)
+        except Exception as e:
+            error = f"{type(e).__name__}: {' '.join(str(e).split())}"  # YAML errors span several lines
+        validated = time.perf_counter()
+        self.publish(error)
+        served = time.perf_counter()
+        event = WatchEvent(trigger, time.time(), served - noticed, validated - noticed, served - validated,
+                           str(stats), len(self.findings) if self.findings is not None else 0, error)
+        self.events.append(event)
+        self.pages['/events.json'] = ('application/json', self._json([asdict(event) for event in self.events]))
+        print(event, flush=True)
+        return event
+
+    def notes(self, error):
+        efs = self.session.efs
+        notes = [efs.describe() if efs.fetched_at is not None else f"EFS data: {efs.source}",
+                 f"Inventory: {self.session.inventory_file}, validated {time.strftime('%Y-%m-%d %H:%M:%S')}"]
+        if error:
+            notes.append(f"Re-validation failed, showing the previous findings: {error}")
+        return notes
+
+    def publish(self, error=None):
+        notes = self.notes(error)
+        findings = self.findings
+        if findings is None:
+            self.pages['/findings.json'] = ('application/json', self._json({'notes': notes, 'error': error}))
+            return
+        html = io.StringIO()
+        render_html_report(findings, html, notes=notes)
+        self.pages['/'] = ('text/html; charset=utf-8', html.getvalue().encode())
+        self.pages['/findings.json'] = ('application/json', self._json({
+            'notes': notes,
+            'error': error,
+            'counts': {attribute: len(getattr(findings, attribute)) for attribute, _, _ in SECTIONS},
+            'findings': {attribute: [finding_record(finding) for finding in getattr(findings, attribute)]
+                         for attribute, _, _ in SECTIONS},
+        }))
+
+    @staticmethod
+    def _json(value):
+        return json.dumps(value).encode()
+
+
+class _Handler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        path = urlsplit(self.path).path
+        page = self.server.daemon.pages.get('/' if path == '/report.html' else path)
+        if page is None:
+            self.send_error(404)
+            return
+        content_type, body = page
+        self.send_response(200)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.send_header('Cache-Control', 'no-store')
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass  # Keep the console for re-validation events
+
+
+def serve(daemon, host='127.0.0.1', port=DEFAULT_PORT):
+    """Serve the daemon's pages from a background thread and return the server."""
+    server = ThreadingHTTPServer((host, port), _Handler)
+    server.daemon = daemon
+    threading.Thread(target=server.serve_forever, name='efs-validation-http', daemon=True).start()
+    return server
+
+
+def watch(daemon, watcher, efs_interval=0, settle=0.1):
+    """Re-validate whenever ``watcher`` sees the inventory change, and every ``efs_interval`` seconds for EFS."""
+    last_efs = time.monotonic()
+    while True:
+        timeout = max(efs_interval - (time.monotonic() - last_efs), 0.01) if efs_interval else 3600
+        if watcher.wait(timeout):
+            noticed = time.perf_counter()
+            # Editors often write a file in several steps; take them as one change
+            while watcher.wait(settle):
+                pass
+            daemon.revalidate('inventory', noticed)
+        elif efs_interval and time.monotonic() - last_efs >= efs_interval:
+            daemon.revalidate('efs', time.perf_counter())
+            last_efs = time.monotonic()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Re-validate an inventory whenever it changes and serve the findings.")
+    parser.add_argument('--inventory', default='inventory.prod.yaml',
+                        help="Ansible inventory to watch (default: %(default)s)")
+    add_efs_arguments(parser)
+    add_inventory_arguments(parser)
+    parser.add_argument('--host', default='127.0.0.1', help="address to serve on (default: %(default)s)")
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT, help="port to serve on (default: %(default)s)")
+    parser.add_argument('--poll-interval', type=float, default=0.5, metavar='SECONDS',
+                        help="how often to check the inventory without inotify (default: %(default)s)")
+    parser.add_argument('--no-inotify', action='store_true', help="poll even if inotify_simple is installed")
+    parser.add_argument('--efs-interval', type=float, default=0, metavar='SECONDS',
+                        help="also re-read EFS this often, 0 to keep the first snapshot (default: %(default)s)")
+    args = parser.parse_args(argv)
+
+    session = ValidationSession(args.inventory, efs_source_from_args(args), inventory_cache=args.inventory_cache,
+                                inventory_parser=args.inventory_parser, group_map=args.group_map)
+    daemon = ValidationDaemon(session)
+    watcher = make_watcher(args.inventory, args.poll_interval, not args.no_inotify)
+    daemon.revalidate('start', time.perf_counter())
+    server = serve(daemon, args.host, args.port)
+    print(f"Watching {args.inventory} ({type(watcher).__name__}); "
+          f"findings on http://{args.host}:{server.server_port}/ and /findings.json", flush=True)
+    try:
+        watch(daemon, watcher, args.efs_interval)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,330 @@
+"""Read the parts of an inventory the checks use straight from the YAML event stream.
+
+Loading a large inventory mostly goes into building nodes and Python objects
+for host vars that nothing reads. :func:`extract_from_events` walks the
+parser's events instead and keeps only what
+:func:`~efs_validation.inventory.build_inventory_index` looks at: the
+``all`` group, each group's ``hosts`` and ``children``, and each host's
+``cells``. Everything else is skipped event by event without being built.
+
+The result has the same shape as the fully loaded document, minus what was
+skipped, so indexing it gives the same result. Anything in those parts that
+only a full load interprets the same way (aliases, merge keys, tags,
+names that would load as something other than str, invalid groups that get
+printed) raises :class:`FullLoadNeeded` so the caller can load the whole
+file instead.
+
+:func:`locate_from_events` walks the same parts but records where each of
+them is in the text instead, for editing the file without re-dumping it.
+"""
+
+from yaml.events import (AliasEvent, DocumentStartEvent, MappingEndEvent, MappingStartEvent, ScalarEvent,
+                         SequenceEndEvent, SequenceStartEvent, StreamEndEvent)
+from yaml.nodes import ScalarNode
+from yaml.resolver import Resolver
+
+STR_TAG = 'tag:yaml.org,2002:str'
+NULL_TAG = 'tag:yaml.org,2002:null'
+_MAP_TAGS = (None, '!', 'tag:yaml.org,2002:map')
+_SEQ_TAGS = (None, '!', 'tag:yaml.org,2002:seq')
+
+_resolve = Resolver().resolve
+
+
+class FullLoadNeeded(Exception):
+    """The inventory uses something only a full load interprets correctly."""
+
+
+def _scalar_tag(event):
+    tag = event.tag
+    if tag is None or tag == '!':
+        return _resolve(ScalarNode, event.value, event.implicit)
+    return tag
+
+
+def _name(event):
+    """The value of a scalar that loads as a str: a group, host or cell name."""
+    if type(event) is not ScalarEvent or _scalar_tag(event) != STR_TAG:
+        raise FullLoadNeeded(f"not a plain string: {event}")
+    return event.value
+
+
+def _key(next_event, event):
+    """The str value of a mapping key, or None (after skipping it) for any other key."""
+    if type(event) is ScalarEvent:
+        tag = _scalar_tag(event)
+        if tag == STR_TAG:
+            return event.value
+        if tag == 'tag:yaml.org,2002:merge':
+            raise FullLoadNeeded("merge key")
+        return None
+    _skip(next_event, event)
+    return None
+
+
+def _is_null(event):
+    return type(event) is ScalarEvent and _scalar_tag(event) == NULL_TAG
+
+
+def _skip(next_event, event):
+    """Consume the node starting with ``event`` without building anything."""
+    if type(event) is not MappingStartEvent and type(event) is not SequenceStartEvent:
+        return  # Scalars and aliases are a single event
+    depth = 1
+    while depth:
+        kind = type(next_event())
+        if kind is MappingStartEvent or kind is SequenceStartEvent:
+            depth += 1
+        elif kind is not ScalarEvent and kind is not AliasEvent:
+            depth -= 1  # A mapping or sequence end
+
+
+def _mapping(next_event, event):
+    """Whether ``event`` starts a mapping that loads as a dict; aliases and other tags need a full load."""
+    if type(event) is MappingStartEvent:
+        if event.tag not in _MAP_TAGS:
+            raise FullLoadNeeded(f"tagged mapping: {event.tag}")
+        return True
+    if type(event) is AliasEvent:
+        raise FullLoadNeeded(f"alias: *{event.anchor}")
+    if type(event) is SequenceStartEvent and event.tag not in _SEQ_TAGS:
+        raise FullLoadNeeded(f"tagged sequence: {event.tag}")
+    return False
+
+
+def _cells(next_event, event):
+    """A host's cells: None or a list of str."""
+    if _is_null(event):
+        return None
+    if type(event) is not SequenceStartEvent or event.tag not in _SEQ_TAGS:
+        raise FullLoadNeeded(f"cells are not a list: {event}")
+    cells = []
+    event = next_event()
+    while type(event) is not SequenceEndEvent:
+        cells.append(_name(event))
+        event = next_event()
+    return cells
+
+
+def _host(next_event, event):
+    """A host's vars, reduced to {'cells': ...} if it declares cells, else None."""
+    if not _mapping(next_event, event):
+        _skip(next_event, event)
+        return None
+    host = None
+    event = next_event()
+    while type(event) is not MappingEndEvent:
+        key = _key(next_event, event)
+        event = next_event()
+        if key == 'cells':
+            host = {'cells': _cells(next_event, event)}
+        else:
+            _skip(next_event, event)
+        event = next_event()
+    return host
+
+
+def _names(next_event, event, value):
+    """A hosts or children mapping as a dict of name -> ``value(next_event, event)``, or None if not a mapping."""
+    if not _mapping(next_event, event):
+        _skip(next_event, event)
+        return None
+    names = {}
+    event = next_event()
+    while type(event) is not MappingEndEvent:
+        name = _name(event)
+        names[name] = value(next_event, next_event())
+        event = next_event()
+    return names
+
+
+def _group(next_event, event):
+    """A group reduced to its 'hosts' and 'children', or None for a group declared with no body."""
+    if _is_null(event):
+        return None
+    if not _mapping(next_event, event):
+        raise FullLoadNeeded(f"invalid group: {event}")  # Reported with its loaded value
+    group = {}
+    event = next_event()
+    while type(event) is not MappingEndEvent:
+        key = _key(next_event, event)
+        event = next_event()
+        if key == 'hosts':
+            group['hosts'] = _names(next_event, event, _host)
+        elif key == 'children':
+            group['children'] = _names(next_event, event, _group)
+        else:
+            _skip(next_event, event)
+        event = next_event()
+    return group
+
+
+def extract_from_events(events):
+    """The inventory document reduced to what indexing it reads, from a ``yaml.parse`` event stream."""
+    next_event = iter(events).__next__
+    next_event()  # StreamStartEvent
+    event = next_event()
+    if type(event) is StreamEndEvent:
+        return None  # An empty file
+    event = next_event()  # The root node, after DocumentStartEvent
+    if _is_null(event):
+        inventory = None
+    elif _mapping(next_event, event):
+        inventory = {}
+        event = next_event()
+        while type(event) is not MappingEndEvent:
+            key = _key(next_event, event)
+            event = next_event()
+            if key == 'all':
+                inventory['all'] = _group(next_event, event)
+            else:
+                _skip(next_event, event)
+            event = next_event()
+    else:
+        raise FullLoadNeeded("the document is not a mapping")
+    next_event()  # DocumentEndEvent
+    if type(next_event()) is DocumentStartEvent:
+        raise FullLoadNeeded("more than one document")  # Which a full load rejects
+    return inventory
+
+
+class Located:
+    """Where a value of the inventory is in the text; lines and columns count from 0.
+
+    ``style`` is 'block' or 'flow' for a mapping or sequence, 'null' for a null
+    scalar and 'scalar' for anything else. ``indent`` is the column of the first
+    key or item of a block collection and ``last_line`` the last line with any
+    of the value on it. A mapping's ``children`` are the Located values of the
+    keys that were asked for; a sequence's ``items`` are
+    ``(line, column, end_line, end_column, value)`` of each str item.
+    """
+
+    __slots__ = ('key_line', 'key_column', 'style', 'start', 'end', 'indent', 'last_line', 'children', 'items')
+
+    def __init__(self, key_event, event):
+        self.key_line = key_event.start_mark.line
+        self.key_column = key_event.start_mark.column
+        kind = type(event)
+        if kind is MappingStartEvent or kind is SequenceStartEvent:
+            self.style = 'flow' if event.flow_style else 'block'
+        else:
+            self.style = 'null' if _is_null(event) else 'scalar'
+        self.start = (event.start_mark.line, event.start_mark.column)
+        self.end = (event.end_mark.line, event.end_mark.column)
+        self.indent = None
+        self.last_line = event.end_mark.line
+        self.children = {}
+        self.items = []
+
+
+class _MarkedEvents:
+    """The next event of a stream, keeping the last line any content so far ended on."""
+
+    def __init__(self, events):
+        self._next = iter(events).__next__
+        self.last_line = 0
+
+    def __call__(self):
+        event = self._next()
+        # The zero-width start and end events of block collections mark where the next token is, not content
+        if type(event) is ScalarEvent or event.end_mark.index != event.start_mark.index:
+            self.last_line = event.end_mark.line
+        return event
+
+
+def _locate_mapping(next_event, event, key_event, value):
+    """Locate the value starting with ``event``; if it is a mapping, also each key ``value(key)`` returns a reader for."""
+    located = Located(key_event, event)
+    if not _mapping(next_event, event):
+        _skip(next_event, event)
+        located.last_line = next_event.last_line
+        return located
+    event = next_event()
+    while type(event) is not MappingEndEvent:
+        if located.indent is None:
+            located.indent = event.start_mark.column
+        key_event = event
+        key = _key(next_event, event)
+        event = next_event()
+        read = value(key) if key is not None else None
+        if read is None:
+            _skip(next_event, event)
+        else:
+            located.children[key] = read(next_event, event, key_event)
+        event = next_event()
+    located.end = (event.end_mark.line, event.end_mark.column)
+    located.last_line = next_event.last_line
+    return located
+
+
+def _locate_cells(next_event, event, key_event):
+    located = Located(key_event, event)
+    if type(event) is not SequenceStartEvent or event.tag not in _SEQ_TAGS:
+        _mapping(next_event, event)  # Only to reject aliases and tags
+        _skip(next_event, event)
+        located.last_line = next_event.last_line
+        return located
+    event = next_event()
+    while type(event) is not SequenceEndEvent:
+        if located.indent is None:
+            located.indent = event.start_mark.column
+        located.items.append((event.start_mark.line, event.start_mark.column,
+                              event.end_mark.line, event.end_mark.column, _name(event)))
+        event = next_event()
+    located.end = (event.end_mark.line, event.end_mark.column)
+    located.last_line = next_event.last_line
+    return located
+
+
+def _host_reader(key):
+    return _locate_cells if key == 'cells' else None
+
+
+def _locate_host(next_event, event, key_event):
+    return _locate_mapping(next_event, event, key_event, _host_reader)
+
+
+def _locate_hosts(next_event, event, key_event):
+    return _locate_mapping(next_event, event, key_event, lambda key: _locate_host)
+
+
+def _locate_children(next_event, event, key_event):
+    return _locate_mapping(next_event, event, key_event, lambda key: _locate_group)
+
+
+def _group_reader(key):
+    return _locate_hosts if key == 'hosts' else _locate_children if key == 'children' else None
+
+
+def _locate_group(next_event, event, key_event):
+    return _locate_mapping(next_event, event, key_event, _group_reader)
+
+
+def locate_from_events(events):
+    """The Located ``all`` group, with its hosts, children and host cells, or None if there is none.
+
+    ``events`` must be a ``yaml.parse`` stream of text (not bytes), so that
+    columns count characters.
+    """
+    next_event = _MarkedEvents(events)
+    next_event()  # StreamStartEvent
+    if type(next_event()) is StreamEndEvent:
+        return None
+    event = next_event()
+    located = None
+    if not _mapping(next_event, event):
+        raise FullLoadNeeded("the document is not a mapping")
+    event = next_event()
+    while type(event) is not MappingEndEvent:
+        key_event = event
+        key = _key(next_event, event)
+        event = next_event()
+        if key == 'all':
+            located = _locate_group(next_event, event, key_event)
+        else:
+            _skip(next_event, event)
+        event = next_event()
+    next_event()  # DocumentEndEvent
+    if type(next_event()) is DocumentStartEvent:
+        raise FullLoadNeeded("more than one document")
+    return located
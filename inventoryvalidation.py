@@ -1,6 +1,12 @@
-import yaml
+import argparse
 import csv
 import re
+from bisect import bisect_left
+from itertools import islice
+
+from efs_validation.cli import add_profile_arguments, profile_from_args
+from efs_validation.inventory import InventorySnapshot
+from efs_validation.profiling import DISABLED
 
 # File paths
 efsservers_file = "efsservers.txt"
@@ -23,73 +29,68 @@ def parse_efsservers(file_path):
 
     return efs_servers
 
-def parse_inventory(file_path):
-    """Parse inventory-lab.yaml and return a dictionary of servers, their cells, relevant host groups, and control groups."""
+# Only groups matching l_*_<region_code> are host groups
+HOST_GROUP_PATTERN = re.compile(r"l_[a-zA-Z0-9_-]+_[a-zA-Z0-9]+")
+
+def parse_inventory(file_path, profile=DISABLED):
+    """Parse inventory-lab.yaml into an InventoryIndex of its hosts, groups and cells, or None if it is invalid.
+
+    The index of an unchanged file is read from the inventory cache instead of parsing the YAML again.
+    """
+    snapshot = InventorySnapshot(file_path, use_cache=True)
     try:
-        with open(file_path, "r") as file:
-            inventory = yaml.safe_load(file)
+        if snapshot.cached_index is None:
+            inventory = snapshot.data
             if not inventory or "all" not in inventory:
                 raise ValueError("Invalid YAML structure: Missing 'all' key.")
+        index = snapshot.index
     except Exception as e:
         print(f"Error parsing inventory file: {e}")
-        return {}
-
-    inventory_servers = {}
-    server_to_group = {}
-    valid_groups = {}
-    server_type_dev = set()
-    server_type_prod = set()
-    control_groups = {}
-
-    def extract_hosts(group, group_name=""):
-        """Recursively extract hosts from relevant groups in YAML"""
-        if not isinstance(group, dict):
-            return
-
-        # Only consider groups matching l_*_<region_code>
-        if re.match(r"l_[a-zA-Z0-9_-]+_[a-zA-Z0-9]+", group_name):
-            valid_groups[group_name] = True  # Track valid groups
-
-            if "hosts" in group and isinstance(group["hosts"], dict):
-                for host, attributes in group["hosts"].items():
-                    if host not in inventory_servers:
-                        inventory_servers[host] = {"cells": set()}
-                    if isinstance(attributes, dict) and "cells" in attributes:
-                        inventory_servers[host]["cells"].update(map(str.strip, attributes["cells"]))
-                    server_to_group[host] = group_name  # Map server to valid host group
-
-        # Extract servers from servertype_dev and servertype_prod groups
-        if group_name == "servertype_dev" and "hosts" in group:
-            server_type_dev.update(group["hosts"].keys())
-        if group_name == "servertype_prod" and "hosts" in group:
-            server_type_prod.update(group["hosts"].keys())
-
-        # Extract control groups
-        if group_name.startswith("controlgroup_") and "hosts" in group:
-            control_groups[group_name] = group["hosts"].keys()
-
-        if "children" in group and isinstance(group["children"], dict):
-            for child_name, child_group in group["children"].items():
-                extract_hosts(child_group, child_name)
-
-    extract_hosts(inventory.get("all", {}))
-    return inventory_servers, server_to_group, valid_groups, server_type_dev, server_type_prod, control_groups
-
-def construct_expected_group(server_name, valid_groups):
-    """Find the actual expected host group for the given server name."""
-    try:
-        base_name = server_name.split("server")[0]  # Extract part before "server"
+        return None
+    print(f"Inventory cache {snapshot.cache_status}")
+    profile.count('inventory_cache_hits', int(snapshot.cache_hit))
+    profile.count('inventory_cache_misses', int(not snapshot.cache_hit))
+    return index
+
+def find_host_groups(index):
+    """The l_*_<region_code> groups of the inventory, in document order, matched once per group name."""
+    return [group for group in index.group_hosts if HOST_GROUP_PATTERN.match(group)]
+
+def build_group_index(valid_groups):
+    """Index the l_<name>_<region_code> groups by region code, sorted for prefix lookups, once per inventory."""
+    tails = []
+    for position, group in enumerate(valid_groups):
+        parts = group.split("_")
+        # <name> may itself contain underscores, so every tail after it is a candidate region code
+        for i in range(2, len(parts)):
+            tails.append(("_".join(parts[i:]), position, group))
+    tails.sort()
+    return {"tails": tails, "keys": [tail for tail, _, _ in tails], "by_prefix": {}}
+
+def expected_group_candidates(server_name, group_index):
+    """All host groups whose region code starts with the server's, memoized per host-name prefix.
+
+    As with matching l_[a-zA-Z0-9_-]+_<region_code> against each group, ausy01 finds l_aja_ausy01sr1.
+    """
+    base_name = server_name.split("server")[0]  # Extract part before "server"
+    candidates = group_index["by_prefix"].get(base_name)
+    if candidates is None:
         region_code = base_name[1:]  # Remove the first letter
-        expected_pattern = re.compile(f"l_[a-zA-Z0-9_-]+_{region_code}")
-
-        # Find the actual matching group name from valid_groups
-        for group in valid_groups:
-            if expected_pattern.match(group):
-                return group  # Return the actual matching group
-
-        return "Unknown"  # If no match found
-    except Exception:
-        return "Unknown"
+        matches = {}
+        for tail, position, group in islice(group_index["tails"], bisect_left(group_index["keys"], region_code), None):
+            if not tail.startswith(region_code):
+                break
+            matches[position] = group
+        candidates = tuple(matches[position] for position in sorted(matches))
+        group_index["by_prefix"][base_name] = candidates
+    return candidates
+
+def construct_expected_group(server_name, group_index):
+    """Find the actual expected host group for the given server name."""
+    candidates = expected_group_candidates(server_name, group_index)
+    if len(candidates) == 1:
+        return candidates[0]
+    return "Unknown"  # No matching group, or several and no way to choose
 
 def validate_control_groups(control_groups, efs_servers):
     control_group_issues = {}
@@ -129,14 +130,21 @@ def validate_control_groups(control_groups, efs_servers):
 
 
 
-def generate_report(efs_servers, inventory_servers, server_to_group, valid_groups, server_type_dev, server_type_prod, control_groups):
+def generate_report(efs_servers, index):
     """Compare efsservers.txt with inventory-lab.yaml and generate a report"""
+    valid_groups = find_host_groups(index)
+    inventory_servers = index.site_cells.keys()
+    server_to_group = index.site_group
+    server_type_dev = index.members("servertype_dev")
+    server_type_prod = index.members("servertype_prod")
+    control_groups = {group: hosts for group, hosts in index.group_hosts.items() if group.startswith("controlgroup_")}
+
     with open(report_file, "w") as report:
         report.write("EFS Inventory vs Ansible Inventory Comparison Report\n")
         report.write("=" * 60 + "\n\n")
 
-        missing_in_inventory = set(efs_servers.keys()) - set(inventory_servers.keys())
-        missing_in_efs_db = set(inventory_servers.keys()) - set(efs_servers.keys())
+        missing_in_inventory = efs_servers.keys() - inventory_servers
+        missing_in_efs_db = inventory_servers - efs_servers.keys()
 
         if missing_in_inventory:
             report.write("Servers in efsservers.txt but missing in inventory-lab.yaml:\n")
@@ -147,26 +155,31 @@ def generate_report(efs_servers, inventory_servers, server_to_group, valid_group
         if missing_in_efs_db:
             report.write("Servers in inventory-lab.yaml but missing in efsservers.txt:\n")
             for server in sorted(missing_in_efs_db):
-                report.write(f"- {server} (Cells: {', '.join(sorted(efs_servers[server]['cells']))})\n")
+                report.write(f"- {server} (Cells: {', '.join(sorted(index.site_cells[server]))})\n")
             report.write("\n")
 
         mismatched_cells = {}
         incorrect_group_servers = []
+        ambiguous_group_servers = []
         mismatched_server_types = []
+        group_index = build_group_index(valid_groups)
 
-        for server in efs_servers.keys() & inventory_servers.keys():
+        for server in efs_servers.keys() & inventory_servers:
             efs_cells = efs_servers[server]["cells"]
-            inv_cells = inventory_servers[server]["cells"]
+            inv_cells = index.site_cells[server]
             if efs_cells != inv_cells:
                 mismatched_cells[server] = (efs_cells, inv_cells)
 
             # Validate server placement in the correct host group
-            expected_group = construct_expected_group(server, valid_groups)
+            candidates = expected_group_candidates(server, group_index)
             found_group = server_to_group.get(server, "Unknown")
 
-            # Only check against valid groups
-            if expected_group != "Unknown" and found_group != expected_group:
-                incorrect_group_servers.append((server, found_group, expected_group))
+            # Only check against a single valid group; report servers matching several
+            if len(candidates) == 1:
+                if found_group != candidates[0]:
+                    incorrect_group_servers.append((server, found_group, candidates[0]))
+            elif candidates:
+                ambiguous_group_servers.append((server, found_group, candidates))
 
             # Validate server type (prod/dev)
             host_type = efs_servers[server]["host_type"]
@@ -200,6 +213,13 @@ def generate_report(efs_servers, inventory_servers, server_to_group, valid_group
                 report.write(f"  - Found in: {found_group}\n")
                 report.write(f"  - Expected in: {expected_group}\n\n")
 
+        if ambiguous_group_servers:
+            report.write("Servers whose expected host group is ambiguous:\n")
+            for server, found_group, candidates in sorted(ambiguous_group_servers):
+                report.write(f"- {server}\n")
+                report.write(f"  - Found in: {found_group}\n")
+                report.write(f"  - Matches: {', '.join(sorted(candidates))}\n\n")
+
         if mismatched_server_types:
             report.write("Servers placed under incorrect servertype groups:\n")
             for server, found_group, expected_group in mismatched_server_types:
@@ -214,12 +234,34 @@ def generate_report(efs_servers, inventory_servers, server_to_group, valid_group
                 report.write(issue + "\n")
             report.write("\n")
 
-        if not (missing_in_inventory or missing_in_efs_db or mismatched_cells or incorrect_group_servers or mismatched_server_types or control_group_issues):
+        if not (missing_in_inventory or missing_in_efs_db or mismatched_cells or incorrect_group_servers or ambiguous_group_servers or mismatched_server_types or control_group_issues):
             report.write("All servers, cell mappings, and control groups match!\n")
 
     print(f"Comparison report generated: {report_file}")
 
+def run(profile):
+    """Parse both files and write the report, one profiled stage each."""
+    with profile.stage('efs_load'):
+        efs_servers = parse_efsservers(efsservers_file)
+    with profile.stage('yaml_load'):
+        index = parse_inventory(inventory_file, profile)
+    if index is None:
+        return
+    profile.count('efs_servers', len(efs_servers))
+    profile.count('efs_cells', len({cell for server in efs_servers.values() for cell in server["cells"]}))
+    profile.count('inventory_hosts', len(index.host_groups))
+    profile.count('inventory_groups', len(index.group_hosts))
+    with profile.stage('compare_and_render'):
+        generate_report(efs_servers, index)
+
 if __name__ == "__main__":
-    efs_servers = parse_efsservers(efsservers_file)
-    inventory_servers, server_to_group, valid_groups, server_type_dev, server_type_prod, control_groups = parse_inventory(inventory_file)
-    generate_report(efs_servers, inventory_servers, server_to_group, valid_groups, server_type_dev, server_type_prod, control_groups)
+    parser = argparse.ArgumentParser(description="Compare efsservers.txt with inventory-lab.yaml.")
+    add_profile_arguments(parser)
+    args = parser.parse_args()
+    profile = profile_from_args(args)
+    profile.call(run, profile)
+    footer = profile.footer_lines()
+    if footer:
+        with open(report_file, "a") as report:
+            report.write("=" * 60 + "\n" + "\n".join(footer) + "\n")
+    profile.write_json(args.profile_json)
@@ -0,0 +1,57 @@
+import re
+
+import pytest
+
+from benchmarks.group_resolver import generate_host_names
+from efs_validation.groups import (PATTERN_TO_GROUP, UNKNOWN_GROUP, GroupResolver, determine_group_from_pattern,
+                                   group_resolver, load_group_map)
+
+
+def legacy_determine_group(server_name, pattern_to_group):
+    """The per-pattern re.match loop the scripts used before GroupResolver."""
+    for pattern, group in pattern_to_group.items():
+        if re.match(pattern, server_name):
+            return group
+    return UNKNOWN_GROUP
+
+
+def test_default_patterns_match_legacy_loop():
+    for name in generate_host_names(5000, unknown_ratio=0.1) + ['', 'lauau2pefs', 'Lauau2pefsp000001']:
+        assert determine_group_from_pattern(name) == legacy_determine_group(name, PATTERN_TO_GROUP)
+
+
+def test_mixed_patterns_match_legacy_loop():
+    mapping = {
+        r"(?i)LAUAU2PEFSX.*": "l_aja_inline",
+        r"(l)\1.*": "l_aja_backref",
+        r"lcnhk0[12]efsp.*": "l_aja_class",
+        r"lauau2pefs.*": "l_aja_ausy01sr1",
+        r"lau.*": "l_aja_broad",
+        r"l.*x$": "l_aja_suffix",
+        r"lsgsg01efs.*": "l_aja_sgsg01",
+    }
+    resolver = GroupResolver(mapping)
+    names = generate_host_names(2000, unknown_ratio=0.2, seed=1)
+    names += ['lauau2pefsxp000001', 'llama', 'lcnhk02efsp000003', 'lcnhk02efsd000003', 'laux', 'lsgsg01efsx', 'zz']
+    for name in names:
+        assert resolver.resolve(name) == legacy_determine_group(name, mapping), name
+
+
+def test_group_map_entries_come_first(tmp_path):
+    group_map = tmp_path / 'groups.yaml'
+    group_map.write_text("'(?i)LAUAU2PEFS.*': l_aja_override\n'(l)\\1.*': l_aja_backref\n")
+    resolver = group_resolver({'lzzzz01efs': 'l_aja_learned', 'lauau2pefs': 'l_aja_learned'}, str(group_map))
+    assert resolver.resolve('lauau2pefsp000001') == 'l_aja_override'
+    assert resolver.resolve('llama') == 'l_aja_backref'
+    assert resolver.resolve('lcnhk01efsp000001') == PATTERN_TO_GROUP['lcnhk01efs.*']
+    assert resolver.resolve('lzzzz01efsp000001') == 'l_aja_learned'
+
+
+def test_load_group_map_rejects_bad_entries(tmp_path):
+    group_map = tmp_path / 'groups.yaml'
+    group_map.write_text("'lab[': l_aja_broken\n")
+    with pytest.raises(ValueError, match="invalid pattern"):
+        load_group_map(str(group_map))
+    group_map.write_text("- lauau2pefs.*\n")
+    with pytest.raises(ValueError, match="expected a mapping"):
+        load_group_map(str(group_map))
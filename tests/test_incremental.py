@@ -0,0 +1,67 @@
+import pytest
+
+from benchmarks.synthetic import generate_fleet, write_efs_file, write_inventory
+from efs_validation import EfsSource, ValidationSession
+from efs_validation.cache import CACHE_DIR_ENV
+from efs_validation.groups import host_prefix
+from efs_validation.incremental import validate_incremental
+
+
+@pytest.fixture
+def fleet(tmp_path, monkeypatch):
+    monkeypatch.setenv(CACHE_DIR_ENV, str(tmp_path / 'cache'))
+    efs_rows, inventory = generate_fleet(600, seed=3)
+    efs_file = tmp_path / 'efsservers.txt'
+    write_efs_file(efs_rows, efs_file)
+    inventory_file = tmp_path / 'inventory.yaml'
+    write_inventory(inventory, inventory_file)
+    return EfsSource(efs_file=str(efs_file)), inventory, str(inventory_file)
+
+
+def validate(efs_source, inventory_file, state_file, full=False):
+    return validate_incremental(ValidationSession(inventory_file, efs_source), str(state_file), full=full)
+
+
+def edit_inventory(inventory):
+    """Change cells, servertype, control group and site placement, and add and drop hosts."""
+    site_groups = [group for group in inventory if group.startswith('l_')]
+    first, second = inventory[site_groups[0]], inventory[site_groups[1]]
+    host = next(iter(first))
+    first[host] = first[host][:1] + ['ausy01sr1c07']
+    moved = list(second)[1]
+    first[moved] = second.pop(moved)
+    dropped = list(second)[2]
+    del second[dropped]
+    for group in ('servertype_dev', 'servertype_prod', 'controlgroup_a', 'controlgroup_b'):
+        inventory[group].pop(dropped, None)
+    retyped = next(iter(inventory['servertype_prod']))
+    inventory['servertype_dev'][retyped] = inventory['servertype_prod'].pop(retyped)
+    unassigned = next(iter(inventory['controlgroup_b']))
+    del inventory['controlgroup_b'][unassigned]
+    added = host_prefix(host) + 'p999999'  # A known site, so the learned prefixes and the state key stay the same
+    first[added] = ['ausy01sr1c07']
+    inventory['servertype_prod'][added] = None
+
+
+def test_incremental_matches_full_after_edit(fleet, tmp_path):
+    efs_source, inventory, inventory_file = fleet
+    first, stats = validate(efs_source, inventory_file, tmp_path / 'state')
+    assert stats.full
+    assert first == validate(efs_source, inventory_file, tmp_path / 'full', full=True)[0]
+
+    edit_inventory(inventory)
+    write_inventory(inventory, inventory_file)
+    incremental, stats = validate(efs_source, inventory_file, tmp_path / 'state')
+    assert not stats.full and stats.changed_hosts
+    full, _ = validate(efs_source, inventory_file, tmp_path / 'full', full=True)
+    assert incremental == full
+    assert incremental != first
+
+
+def test_reordered_groups_change_no_hosts(fleet, tmp_path):
+    efs_source, inventory, inventory_file = fleet
+    validate(efs_source, inventory_file, tmp_path / 'state')
+    write_inventory(dict(reversed(list(inventory.items()))), inventory_file)
+    incremental, stats = validate(efs_source, inventory_file, tmp_path / 'state')
+    assert not stats.full and stats.changed_hosts == 0
+    assert incremental == validate(efs_source, inventory_file, tmp_path / 'full', full=True)[0]
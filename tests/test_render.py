@@ -0,0 +1,55 @@
+import csv
+import json
+
+from benchmarks.synthetic import generate_fleet, write_efs_file, write_inventory
+from efs_validation import EfsSource, ValidationSession
+from efs_validation.cache import CACHE_DIR_ENV
+from efs_validation.findings import RECORD_FIELDS, SECTIONS
+from efs_validation.render import open_findings_writer, write_findings
+
+
+def validate_fleet(tmp_path):
+    efs_rows, inventory = generate_fleet(400, seed=5)
+    write_efs_file(efs_rows, tmp_path / 'efsservers.txt')
+    write_inventory(inventory, tmp_path / 'inventory.yaml')
+    session = ValidationSession(str(tmp_path / 'inventory.yaml'), EfsSource(efs_file=str(tmp_path / 'efsservers.txt')))
+    findings = session.validate()
+    assert all(getattr(findings, attribute) for attribute, _, _ in SECTIONS), "every check should have findings"
+    return findings
+
+
+def write(findings, path, findings_format=None):
+    with open_findings_writer(str(path), findings_format) as writer:
+        write_findings(findings, writer)
+        assert writer.count == len(findings)
+
+
+def test_jsonl_records_have_every_field(tmp_path, monkeypatch):
+    monkeypatch.setenv(CACHE_DIR_ENV, str(tmp_path / 'cache'))
+    findings = validate_fleet(tmp_path)
+    write(findings, tmp_path / 'findings.jsonl')
+    with open(tmp_path / 'findings.jsonl') as file:
+        records = [json.loads(line) for line in file]
+    assert len(records) == len(findings)
+    assert all(tuple(record) == RECORD_FIELDS for record in records)
+    assert {record['category'] for record in records} == {finding.category for _, items, _ in findings.sections()
+                                                         for finding in items}
+    for record in records:
+        assert record['message']
+        for key in ('expected_cells', 'actual_cells', 'hosts'):
+            assert record[key] is None or isinstance(record[key], list)
+
+
+def test_csv_rows_follow_the_header(tmp_path, monkeypatch):
+    monkeypatch.setenv(CACHE_DIR_ENV, str(tmp_path / 'cache'))
+    findings = validate_fleet(tmp_path)
+    write(findings, tmp_path / 'findings.csv')
+    with open(tmp_path / 'findings.csv', newline='') as file:
+        rows = list(csv.reader(file))
+    assert tuple(rows[0]) == RECORD_FIELDS
+    assert len(rows) == len(findings) + 1
+    assert all(len(row) == len(RECORD_FIELDS) for row in rows[1:])
+
+    write(findings, tmp_path / 'findings.out', 'csv')
+    with open(tmp_path / 'findings.out', newline='') as file:
+        assert list(csv.reader(file)) == rows